@@ -0,0 +1,36 @@
+import os
+import numpy as np
+
+CHECKPOINT_INTERVAL = 60
+
+def save_checkpoint(file_path, key, best_length, best_path, abandon_length, rng_state, stats, second_nodes=None):
+    version, internal, gauss = rng_state
+    # write under a temporary name first so a crash mid-write keeps the previous checkpoint
+    temp_file = f"{file_path}.{os.getpid()}.tmp.npz"
+    np.savez(temp_file,
+             key=np.array(key),
+             best_length=np.float64(best_length),
+             best_path=np.asarray(best_path if best_path is not None else [], dtype=np.int32),
+             abandon_length=np.float64(abandon_length),
+             rng_version=np.int64(version),
+             rng_state=np.array(internal, dtype=np.int64),
+             rng_gauss=np.float64(np.nan if gauss is None else gauss),
+             second_nodes=np.asarray(second_nodes if second_nodes is not None else [], dtype=np.int32),
+             has_second_nodes=second_nodes is not None,
+             **{"stat_" + name: np.float64(value) for name, value in stats.items()})
+    os.replace(temp_file, file_path)
+
+def load_checkpoint(file_path, key):
+    with np.load(file_path) as data:
+        if str(data["key"]) != key:
+            raise ValueError(f"{file_path} was saved for a different input file")
+        gauss = float(data["rng_gauss"])
+        best_path = data["best_path"].tolist()
+        return {
+            "best_length": float(data["best_length"]),
+            "best_path": best_path or None,
+            "abandon_length": float(data["abandon_length"]),
+            "rng_state": (int(data["rng_version"]), tuple(data["rng_state"].tolist()), None if np.isnan(gauss) else gauss),
+            "second_nodes": data["second_nodes"].tolist() if bool(data["has_second_nodes"]) else None,
+            "stats": {name[len("stat_"):]: float(data[name]) for name in data.files if name.startswith("stat_")},
+        }
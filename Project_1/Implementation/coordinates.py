@@ -0,0 +1,79 @@
+from pathlib import Path
+import itertools
+import os
+import numpy as np
+
+PARSE_ROWS = 65536
+
+def _delimiter(file_path):
+    # the .csv datasets are comma separated, the .txt ones whitespace aligned
+    return ',' if str(file_path).lower().endswith('.csv') else None
+
+def _find_bad_row(lines, first_row, delimiter):
+    for row_num, line in enumerate(lines, first_row):
+        values = line.strip().split(delimiter)
+        if len(values) != 2:
+            raise ValueError(f"Row {row_num} must contain 2 values")
+        try:
+            float(values[0]), float(values[1])
+        except ValueError:
+            raise ValueError(f"Row {row_num} must contain 2 numbers") from None
+    raise ValueError(f"Rows {first_row} to {first_row + len(lines) - 1} could not be read")
+
+def read_coordinate_chunks(file_path, chunk_rows=PARSE_ROWS):
+    # parse a block of lines at a time straight into float arrays; rows are only checked one by one to name a bad one
+    delimiter = _delimiter(file_path)
+    with open(file_path, 'r') as f:
+        first_row = 1
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            try:
+                chunk = np.loadtxt(lines, delimiter=delimiter, dtype=np.float64, ndmin=2)
+            except ValueError:
+                chunk = None
+            if chunk is None or chunk.shape != (len(lines), 2):
+                _find_bad_row(lines, first_row, delimiter)
+            yield chunk
+            first_row += len(lines)
+
+def parse_coordinates(file_path, chunk_rows=PARSE_ROWS):
+    chunks = list(read_coordinate_chunks(file_path, chunk_rows))
+    return np.ascontiguousarray(np.concatenate(chunks)) if chunks else np.empty((0, 2))
+
+def sidecar_path(file_path):
+    return Path(str(file_path) + ".npy")
+
+def _load_sidecar(file_path):
+    sidecar = sidecar_path(file_path)
+    try:
+        if sidecar.stat().st_mtime_ns < os.stat(file_path).st_mtime_ns:
+            return None
+        coords = np.load(sidecar, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if coords.ndim != 2 or coords.shape[1] != 2 or coords.dtype != np.float64:
+        return None
+    return coords
+
+def _save_sidecar(file_path, coords):
+    sidecar = sidecar_path(file_path)
+    # same temp-then-rename as the distance cache, so a concurrent reader never maps a partial file
+    temp_file = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp.npy")
+    try:
+        np.save(temp_file, coords)
+        os.replace(temp_file, sidecar)
+    except OSError:
+        temp_file.unlink(missing_ok=True)
+        return coords
+    return np.load(sidecar, mmap_mode='r')
+
+def load_coordinates(file_path, dtype=np.float64, cache=True):
+    # an up-to-date .npy sidecar next to the dataset is memory-mapped instead of parsing the text again
+    coords = _load_sidecar(file_path) if cache else None
+    if coords is None:
+        coords = parse_coordinates(file_path)
+        if cache and len(coords):
+            coords = _save_sidecar(file_path, coords)
+    return coords if coords.dtype == dtype else coords.astype(dtype)
@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import math
+import os
+import numpy as np
+
+CACHE_DIR = Path(os.environ.get("DRONE_CACHE_DIR", Path.home() / ".cache" / "drone_path"))
+MEMORY_BUDGET = 512 * 1024 * 1024
+# least recently used matrices are deleted once the cache directory grows past this
+DISK_BUDGET = 2 * 1024 * 1024 * 1024
+ROW_BLOCK = 1024
+# above this many points the dense matrix is replaced by an on-demand oracle
+DENSE_LIMIT = 5000
+
+_memory_cache = OrderedDict()
+_memory_bytes = 0
+
+def coordinates_key(coordinates, dtype=np.float32):
+    coords = np.ascontiguousarray(coordinates, dtype=np.float64)
+    digest = hashlib.sha1(coords.tobytes())
+    digest.update(str(coords.shape).encode())
+    digest.update(np.dtype(dtype).str.encode())
+    return digest.hexdigest()
+
+def compute_distance_matrix(coordinates, dtype=np.float32):
+    coords = np.asarray(coordinates, dtype=np.float64)
+    x = coords[:, 0]
+    y = coords[:, 1]
+    num_nodes = len(coords)
+
+    # fill the result block by block so only one block-sized scratch buffer is ever allocated
+    dist_matrix = np.empty((num_nodes, num_nodes), dtype=dtype)
+    scratch = np.empty((min(ROW_BLOCK, num_nodes), num_nodes), dtype=dtype)
+    for start in range(0, num_nodes, ROW_BLOCK):
+        stop = min(start + ROW_BLOCK, num_nodes)
+        block = dist_matrix[start:stop]
+        dy = scratch[:stop - start]
+        np.subtract(x[start:stop, np.newaxis], x[np.newaxis, :], out=block, casting='same_kind')
+        np.square(block, out=block)
+        np.subtract(y[start:stop, np.newaxis], y[np.newaxis, :], out=dy, casting='same_kind')
+        np.square(dy, out=dy)
+        block += dy
+        np.sqrt(block, out=block)
+    return dist_matrix
+
+def _remember(key, dist_matrix):
+    global _memory_bytes
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return
+    if dist_matrix.nbytes > MEMORY_BUDGET:
+        return
+    _memory_cache[key] = dist_matrix
+    _memory_bytes += dist_matrix.nbytes
+    while _memory_bytes > MEMORY_BUDGET:
+        _, evicted = _memory_cache.popitem(last=False)
+        _memory_bytes -= evicted.nbytes
+
+def _load_from_disk(key):
+    cache_file = CACHE_DIR / f"{key}.npy"
+    try:
+        dist_matrix = np.load(cache_file, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    # the modification time doubles as the last-use time for eviction
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+    return dist_matrix
+
+def _evict_from_disk(keep):
+    files = []
+    for cache_file in CACHE_DIR.glob("*.npy"):
+        try:
+            stat = cache_file.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, cache_file))
+    total = sum(size for _, size, _ in files)
+    for _, size, cache_file in sorted(files):
+        if total <= DISK_BUDGET:
+            break
+        if cache_file == keep:
+            continue
+        # an open memory map keeps its data after the unlink
+        cache_file.unlink(missing_ok=True)
+        total -= size
+
+def _save_to_disk(key, dist_matrix):
+    cache_file = CACHE_DIR / f"{key}.npy"
+    # write under a temporary name first so concurrent readers never see a partial file
+    temp_file = CACHE_DIR / f"{key}.{os.getpid()}.tmp.npy"
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.save(temp_file, dist_matrix)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        temp_file.unlink(missing_ok=True)
+        return dist_matrix
+    _evict_from_disk(cache_file)
+    return np.load(cache_file, mmap_mode='r')
+
+def distance_matrix(coordinates, dtype=np.float32, cache=True):
+    # cache=False for transient point sets, such as one k-means cluster, whose key never comes up again
+    if not cache:
+        return compute_distance_matrix(coordinates, dtype)
+
+    key = coordinates_key(coordinates, dtype)
+    dist_matrix = _memory_cache.get(key)
+    if dist_matrix is not None:
+        _memory_cache.move_to_end(key)
+        return dist_matrix
+
+    dist_matrix = _load_from_disk(key)
+    if dist_matrix is None:
+        dist_matrix = _save_to_disk(key, compute_distance_matrix(coordinates, dtype))
+    _remember(key, dist_matrix)
+    return dist_matrix
+
+def clear_cache(disk=False):
+    global _memory_bytes
+    _memory_cache.clear()
+    _memory_bytes = 0
+    if disk and CACHE_DIR.exists():
+        for cache_file in CACHE_DIR.glob("*.npy"):
+            cache_file.unlink(missing_ok=True)
+
+class DistanceOracle:
+    # computes distances from coordinates on demand so memory stays O(n)
+    def __init__(self, coordinates):
+        from scipy.spatial import cKDTree
+
+        self.coords = np.ascontiguousarray(coordinates, dtype=np.float64)
+        self.shape = (len(self.coords), len(self.coords))
+        self.dtype = self.coords.dtype
+        self.tree = cKDTree(self.coords)
+        self._x = self.coords[:, 0].tolist()
+        self._y = self.coords[:, 1].tolist()
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            rows, cols = index
+            diff = self.coords[rows] - self.coords[cols]
+        else:
+            diff = self.coords[index][..., np.newaxis, :] - self.coords
+        return np.hypot(diff[..., 0], diff[..., 1])
+
+    def item(self, a, b):
+        return math.hypot(self._x[a] - self._x[b], self._y[a] - self._y[b])
+
+    def neighbors(self, k):
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return [[] for _ in range(len(self))]
+        _, nearest = self.tree.query(self.coords, k + 1)
+        return [[j for j in row if j != i][:k] for i, row in enumerate(nearest.tolist())]
+
+def distance_provider(coordinates, dtype=np.float32, cache=True):
+    if len(coordinates) > DENSE_LIMIT:
+        return DistanceOracle(coordinates)
+    return distance_matrix(coordinates, dtype, cache)
@@ -0,0 +1,171 @@
+import numpy as np
+from local_search import improve_tour, tour_length
+
+# Held-Karp keeps a (2^(n-1), n-1) table; past ~16 points branch and bound on the 1-tree bound is faster
+HELD_KARP_LIMIT = 16
+BRANCH_AND_BOUND_LIMIT = 30
+MAX_BRANCH_NODES = 20000
+
+def _popcounts(num_masks, bits):
+    masks = np.arange(num_masks)
+    counts = np.zeros(num_masks, dtype=np.int8)
+    for b in range(bits):
+        counts += (masks >> b) & 1
+    return masks, counts
+
+def held_karp(matrix):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    if n <= 3:
+        path = list(range(n)) + [0]
+        return tour_length(path, matrix), path
+
+    # node 0 is the fixed start; bit i of a mask stands for node i+1
+    m = n - 1
+    inner = matrix[1:, 1:]
+    full = (1 << m) - 1
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int8)
+    singles = 1 << np.arange(m)
+    dp[singles, np.arange(m)] = matrix[0, 1:]
+
+    masks, counts = _popcounts(1 << m, m)
+    for size in range(1, m):
+        layer = masks[counts == size]
+        for v in range(m):
+            sources = layer[(layer >> v) & 1 == 0]
+            candidates = dp[sources] + inner[:, v]
+            best = candidates.argmin(axis=1)
+            targets = sources | (1 << v)
+            dp[targets, v] = candidates[np.arange(len(sources)), best]
+            parent[targets, v] = best
+
+    closing = dp[full] + matrix[1:, 0]
+    last = int(closing.argmin())
+    length = float(closing[last])
+
+    path = []
+    mask = full
+    while last != -1:
+        path.append(last + 1)
+        prev = int(parent[mask, last])
+        mask ^= 1 << last
+        last = prev
+    path = [0] + path[::-1] + [0]
+    return length, path
+
+def _mst(weights, with_degrees=False):
+    # Prim's algorithm on a small dense weight matrix
+    k = len(weights)
+    degrees = np.zeros(k, dtype=int)
+    if k <= 1:
+        return (0.0, degrees) if with_degrees else 0.0
+    in_tree = np.zeros(k, dtype=bool)
+    in_tree[0] = True
+    cheapest = weights[0].copy()
+    parent = np.zeros(k, dtype=int)
+    total = 0.0
+    for _ in range(k - 1):
+        cheapest[in_tree] = np.inf
+        j = cheapest.argmin()
+        total += cheapest[j]
+        in_tree[j] = True
+        if with_degrees:
+            degrees[j] += 1
+            degrees[parent[j]] += 1
+            closer = weights[j] < cheapest
+            parent[closer] = j
+        np.minimum(cheapest, weights[j], out=cheapest)
+    return (total, degrees) if with_degrees else total
+
+def one_tree_bound(matrix, iterations=200, upper_bound=None):
+    # Held-Karp lower bound: subgradient ascent on node penalties over 1-trees rooted at node 0
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    penalties = np.zeros(n)
+    best_bound = -np.inf
+    best_penalties = penalties.copy()
+    if n < 3:
+        return float(tour_length(list(range(n)) + [0], matrix)), best_penalties
+
+    upper = upper_bound if upper_bound is not None else improve_tour(list(range(n)) + [0], matrix)[0]
+    step_scale = 2.0
+    stalled = 0
+    for _ in range(iterations):
+        weights = matrix + penalties[:, np.newaxis] + penalties[np.newaxis, :]
+        tree_length, inner_degrees = _mst(weights[1:, 1:], with_degrees=True)
+        # node 0 joins the tree through its two cheapest edges
+        nearest = np.argsort(weights[0, 1:])[:2]
+        degrees = np.concatenate(([2], inner_degrees))
+        degrees[nearest + 1] += 1
+        bound = tree_length + weights[0, 1:][nearest].sum() - 2 * penalties.sum()
+
+        if bound > best_bound + 1e-9:
+            best_bound, best_penalties, stalled = bound, penalties.copy(), 0
+        else:
+            stalled += 1
+            if stalled >= 10:
+                step_scale /= 2
+                stalled = 0
+        subgradient = degrees - 2
+        norm = (subgradient ** 2).sum()
+        if norm == 0 or step_scale < 1e-4:
+            break
+        penalties = penalties + step_scale * (upper - bound) / norm * subgradient
+
+    return float(best_bound), best_penalties
+
+def branch_and_bound(matrix, max_nodes=MAX_BRANCH_NODES):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+
+    # seed the incumbent with a locally optimal tour so most branches are cut immediately
+    best_length, best_path = improve_tour(list(range(n)) + [0], matrix)
+    root_bound, penalties = one_tree_bound(matrix)
+    if root_bound >= best_length - 1e-9:
+        return float(best_length), best_path, True
+
+    # every tour has penalised length = length + 2 * sum(penalties), so bounds on penalised costs stay valid
+    weights = matrix + penalties[:, np.newaxis] + penalties[np.newaxis, :]
+    offset = 2 * penalties.sum()
+    expanded = 0
+    proven = True
+
+    stack = [(0.0, 0.0, [0], frozenset(range(1, n)))]
+    while stack:
+        length, weighted, path, remaining = stack.pop()
+        current = path[-1]
+        if not remaining:
+            total = length + matrix[current, 0]
+            if total < best_length:
+                best_length, best_path = total, path + [0]
+            continue
+
+        expanded += 1
+        if expanded > max_nodes:
+            proven = False
+            break
+
+        unvisited = sorted(remaining)
+        completion = (_mst(weights[np.ix_(unvisited, unvisited)])
+                      + weights[current, unvisited].min()
+                      + weights[unvisited, 0].min())
+        if weighted + completion - offset >= best_length - 1e-9:
+            continue
+        # push the farthest child first so the nearest one is explored next
+        for node in sorted(unvisited, key=lambda j: -matrix[current, j]):
+            child_length = length + matrix[current, node]
+            if child_length < best_length:
+                stack.append((child_length, weighted + weights[current, node], path + [node], remaining - {node}))
+
+    return float(best_length), best_path, proven
+
+def solve_exact(matrix):
+    n = len(matrix)
+    if n <= HELD_KARP_LIMIT:
+        return held_karp(matrix)
+    if n <= BRANCH_AND_BOUND_LIMIT:
+        length, path, proven = branch_and_bound(matrix)
+        if proven:
+            return length, path
+    return None
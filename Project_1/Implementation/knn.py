@@ -1,151 +1,431 @@
-import csv
-from typing import List, Tuple
 import numpy as np
-import matplotlib.pyplot as plt
 import random
 import math
-import threading
 import time
-import select
-import sys
-
-def read_coords_as_tuple(file_path:str) -> List[Tuple[float,float]]: 
-    coordinates = []
-    try:
-        with open(file_path, 'r' , newline = '') as csvfile:
-            csv_reader = csv.reader(csvfile)
-
-            for row_num, row in enumerate(csv_reader,1):
-                if(len(row)!=2):
-                    raise ValueError(f"Row {row_num} must contain 2 values")
-                try : 
-                    x = float(row[0])
-                    y = float(row[1])
-                    coordinates.append((x,y))
-                except ValueError as e:
-                    raise ValueError (f"Row {row_num}: Unable to convert values to float")
-    except FileNotFoundError:
-        raise FileNotFoundError(f"CSV file not found: {file_path}")
-    return coordinates
-
-def distance_matrix(coordinates):
-    coordinates = np.array(coordinates)
-    x = coordinates[:,0]
-    y = coordinates[:,1]
-
-    dx = x[:, np.newaxis] - x [np.newaxis, :]
-    dy = y[:,np.newaxis] - y[np.newaxis,:]
-    dist_matrix = np.sqrt(dx**2 + dy**2)
-    return dist_matrix
-
-
-def plot_path(coords, path, filename):
-    coords = np.array(coords)
-    plt.figure(figsize=(7,7))
-    plt.scatter(coords[:, 0],coords[:, 1], c='blue')
-
-    for i in range(len(path) - 1):
-        x1, y1 = coords[path[i]]
-        x2, y2 = coords[path[i+1]]
-        plt.plot([x1,x2], [y1,y2], 'r-', linewidth=1)
-
-    plt.scatter(coords[path[0], 0], coords[path[0], 1], c = 'green', s = 100, label= 'Start')
-    plt.scatter(coords[path[-1], 0], coords[path[-1], 1], c='red', s=100, label = 'End')
-    plt.title("Best Path So Far")
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, format ='jpeg')
-    plt.close()
-
-def nn_temperature(best_path, matrix):
-
-    starting_node = 0
-
-    path = [starting_node]
-    visited = {starting_node}
-    path_length = 0
-
-    next_node = random.choice([i for i in range(1,len(matrix))])
-    path.append(next_node)
-    visited.add(next_node)
-    path_length = matrix[starting_node][next_node]
-
-    for i in range(len(matrix) - 2):
-        curr_node = path[-1]
-        next_node = None
-        best_distance = float('inf')
-        
-        for j in range(len(matrix)):
-            if j in visited:
-                continue
-            curr_distance = matrix[curr_node][j]
-
-         
-            if curr_distance < best_distance:
-                next_node = j
-                best_distance = curr_distance
-    
+import os
+import signal
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from local_search import improve_tour, tour_length
+from distances import distance_provider, coordinates_key, DistanceOracle
+from spatial import GridIndex
+from stop_control import StopControl
+from exact import solve_exact
+from coordinates import load_coordinates
+from checkpoint import save_checkpoint, load_checkpoint, CHECKPOINT_INTERVAL
+from metrics import SearchMetrics, lower_bound
+from plotting import plot_path, render
+from solutions import save_solution, load_solution, solution_path
+
+def _nn_oracle(best_path, oracle, starting_node, second_node):
+    num_nodes = len(oracle)
+    path = [starting_node, second_node]
+    unvisited = GridIndex(oracle.coords)
+    unvisited.remove(starting_node)
+    unvisited.remove(second_node)
+    path_length = oracle.item(starting_node, second_node)
+
+    curr_node = second_node
+    for i in range(2, num_nodes):
+        next_node, best_distance = unvisited.nearest(curr_node)
         if next_node is None:
             return float('inf'), None
         path_length += best_distance
         path.append(next_node)
-        visited.add(next_node)
-        
+        unvisited.remove(next_node)
+        curr_node = next_node
+
         if path_length >= best_path:
             return float('inf'), None
 
+    path_length += oracle.item(curr_node, starting_node)
+    path.append(starting_node)
+    return path_length, path
 
-    path_length += matrix[path[-1]][0]
-    path.append(0)
+def nn_temperature(best_path, matrix, second_node=None):
+    num_nodes = len(matrix)
+    if num_nodes < 3:
+        path = list(range(num_nodes)) + [0]
+        path_length = float(sum(matrix[path[i]][path[i+1]] for i in range(len(path) - 1)))
+        if path_length >= best_path:
+            return float('inf'), None
+        return path_length, path
 
-    return path_length, path
+    starting_node = 0
+    if second_node is None:
+        second_node = random.randrange(1, num_nodes)
+    if isinstance(matrix, DistanceOracle):
+        return _nn_oracle(best_path, matrix, starting_node, second_node)
+
+    path = np.empty(num_nodes + 1, dtype=np.intp)
+    path[0] = starting_node
+    path[1] = second_node
+    path_length = matrix[starting_node, second_node]
+
+    # visited nodes carry an infinite penalty so one argmin picks the nearest unvisited node
+    penalty = np.zeros(num_nodes)
+    penalty[starting_node] = np.inf
+    penalty[second_node] = np.inf
+    row = np.empty(num_nodes)
+
+    curr_node = second_node
+    for i in range(2, num_nodes):
+        np.add(matrix[curr_node], penalty, out=row)
+        next_node = row.argmin()
+        best_distance = row[next_node]
+
+        if best_distance == np.inf:
+            return float('inf'), None
+        path_length += best_distance
+        path[i] = next_node
+        penalty[next_node] = np.inf
+        curr_node = next_node
 
-def find_best_path():
-    print("Please Enter Desired Filename: ")
-    
-    file_name = input().strip()
-    
-    base_name = file_name.rsplit('.', 1)[0]
-    coordinate_list = read_coords_as_tuple(file_name)
-    num_nodes = len(coordinate_list)
+        if path_length >= best_path:
+            return float('inf'), None
+
+    path_length += matrix[curr_node, starting_node]
+    path[num_nodes] = starting_node
+
+    return float(path_length), path.tolist()
 
-    print(f"There are {num_nodes} total nodes")
+def nn_temperature_batch(best_path, matrix, second_nodes):
+    num_nodes = len(matrix)
+    if num_nodes < 3:
+        return nn_temperature(best_path, matrix)
 
-    dist_matrix = distance_matrix(coordinate_list)
+    second_nodes = np.asarray(second_nodes, dtype=np.intp)
+    batch = len(second_nodes)
+    starting_node = 0
+
+    # one row per tour, all grown in lockstep
+    paths = np.empty((batch, num_nodes + 1), dtype=np.intp)
+    paths[:, 0] = starting_node
+    paths[:, 1] = second_nodes
+    path_lengths = matrix[starting_node, second_nodes].astype(float)
+
+    rows = np.arange(batch)
+    penalty = np.zeros((batch, num_nodes))
+    penalty[:, starting_node] = np.inf
+    penalty[rows, second_nodes] = np.inf
+
+    curr_nodes = second_nodes
+    for i in range(2, num_nodes):
+        candidates = matrix[curr_nodes]
+        candidates += penalty
+        next_nodes = candidates.argmin(axis=1)
+        path_lengths += candidates[rows, next_nodes]
+        paths[:, i] = next_nodes
+        penalty[rows, next_nodes] = np.inf
+        curr_nodes = next_nodes
+
+        # drop tours that can no longer beat the best so far
+        alive = path_lengths < best_path
+        if not alive.all():
+            if not alive.any():
+                return float('inf'), None
+            paths = paths[alive]
+            path_lengths = path_lengths[alive]
+            penalty = penalty[alive]
+            curr_nodes = curr_nodes[alive]
+            rows = np.arange(len(curr_nodes))
+
+    path_lengths += matrix[curr_nodes, starting_node]
+    paths[:, num_nodes] = starting_node
+
+    best = path_lengths.argmin()
+    return float(path_lengths[best]), paths[best].tolist()
+
+def _claim_batch(nodes, cursor, claims, index, batch_size):
+    with cursor.get_lock():
+        start = cursor.value
+        if start >= len(nodes):
+            return None
+        cursor.value = min(start + batch_size, len(nodes))
+        # the parent counts a claimed batch as unsearched until the worker clears its claim
+        claims[index] = start
+        return nodes[start:cursor.value]
+
+def _search_worker(shm_name, shape, dtype, is_oracle, seed, shared_length, counts, stop_event, results, sweep, batch_size, improve):
+    # Ctrl+C is handled by the parent, which stops the workers through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if is_oracle:
+        matrix = DistanceOracle(matrix)
+    if batch_size:
+        nodes, cursor, claims, index = sweep
+    try:
+        random.seed(seed)
+        # every worker finishes one restart, so a stop right after start-up still has an answer
+        first = True
+        while first or not stop_event.is_set():
+            first = False
+            if batch_size:
+                batch = _claim_batch(nodes, cursor, claims, index, batch_size)
+                if batch is None:
+                    break
+                path_length, new_path = nn_temperature_batch(shared_length.value, matrix, batch)
+            else:
+                path_length, new_path = nn_temperature(shared_length.value, matrix)
+            # counts holds restarts and pruned restarts for the parent's metrics
+            count = len(batch) if batch_size else 1
+            with counts.get_lock():
+                counts[0] += count
+                counts[1] += count if new_path is None or path_length >= shared_length.value else count - 1
+
+            # publish the tighter bound before the slower improvement stage
+            if new_path is not None:
+                with shared_length.get_lock():
+                    if path_length >= shared_length.value:
+                        new_path = None
+                    else:
+                        shared_length.value = path_length
+            if new_path is not None:
+                if improve:
+                    path_length, new_path = improve_tour(new_path, matrix, should_stop=stop_event.is_set)
+                results.put((path_length, new_path))
+            if batch_size:
+                claims[index] = -1
+    finally:
+        del matrix
+        shm.close()
+
+def parallel_search(dist_matrix, workers, should_stop, batch_size=None, improve=True, on_improvement=None,
+                    best_length=float('inf'), best_path=None, abandon_length=float('inf'), metrics=None, second_nodes=None):
+    num_nodes = len(dist_matrix)
+    is_oracle = isinstance(dist_matrix, DistanceOracle)
+    shared = dist_matrix.coords if is_oracle else np.ascontiguousarray(dist_matrix)
+
+    # workers map the matrix (or the oracle's coordinates) from shared memory instead of receiving a pickled copy
+    shm = shared_memory.SharedMemory(create=True, size=shared.nbytes)
+    np.ndarray(shared.shape, dtype=shared.dtype, buffer=shm.buf)[:] = shared
+
+    # spawn, not fork: the stdin watcher thread holds locks a forked child would inherit
+    ctx = mp.get_context("spawn")
+    shared_length = ctx.Value('d', abandon_length)
+    counts = ctx.Array('q', 2)
+    stop_event = ctx.Event()
+    results = ctx.Queue()
+
+    # batched mode sweeps the second nodes through one shared cursor; `second_nodes` is kept up to date with
+    # what is still unsearched, so the caller can checkpoint the sweep
+    if batch_size:
+        if second_nodes is None:
+            second_nodes = list(range(1, num_nodes))
+            random.shuffle(second_nodes)
+        nodes = ctx.Array('q', second_nodes, lock=False)
+        cursor = ctx.Value('q', 0)
+        claims = ctx.Array('q', [-1] * workers, lock=False)
+
+    def unclaimed():
+        with cursor.get_lock():
+            in_flight = [node for start in claims if start >= 0 for node in nodes[start:start + batch_size]]
+            return in_flight + nodes[cursor.value:]
+
+    def collect(timeout=None):
+        nonlocal best_length, best_path
+        try:
+            while True:
+                path_length, new_path = results.get(timeout=timeout) if timeout else results.get_nowait()
+                if path_length < best_length:
+                    best_length = path_length
+                    best_path = new_path
+                    if on_improvement:
+                        on_improvement(best_length, best_path, shared_length.value)
+        except queue.Empty:
+            pass
+        if metrics:
+            metrics.restarts, metrics.pruned = counts[0], counts[1]
+        if batch_size:
+            second_nodes[:] = unclaimed()
+
+    procs = []
+    try:
+        for i in range(workers):
+            seed = random.randrange(2**63)
+            sweep = (nodes, cursor, claims, i) if batch_size else None
+            proc = ctx.Process(target=_search_worker, args=(shm.name, shared.shape, shared.dtype.str, is_oracle, seed, shared_length,
+                                                            counts, stop_event, results, sweep, batch_size, improve), daemon=True)
+            proc.start()
+            procs.append(proc)
+
+        # the stop reaches the workers at once, so their local search can cut short the tour they are improving
+        while not should_stop() and any(proc.is_alive() for proc in procs):
+            collect(timeout=0.1)
+
+        stop_event.set()
+        # keep draining so no worker blocks on a full queue while exiting
+        while any(proc.is_alive() for proc in procs):
+            collect(timeout=0.1)
+        collect()
+    finally:
+        stop_event.set()
+        for proc in procs:
+            proc.join()
+        shm.close()
+        shm.unlink()
+
+    return best_length, best_path
+
+def search_path(coordinate_list, batch_size=None, improve=True, workers=None, time_budget=None, target_length=None,
+                checkpoint_file=None, checkpoint_interval=CHECKPOINT_INTERVAL, resume=False, gap_tolerance=None,
+                metrics_file=None, metrics=None, enter=True, warm_start=None):
+    num_nodes = len(coordinate_list)
+    dist_matrix = distance_provider(coordinate_list)
 
     best_length = float('inf')
     best_path = None
+    # constructed tours are abandoned against the best unimproved tour, not the improved one
+    abandon_length = float('inf')
+    second_nodes = None
+    stats = {"elapsed": 0.0, "restarts": 0, "improvements": 0}
+
+    if checkpoint_file is None:
+        checkpoint_interval = None
+    key = coordinates_key(coordinate_list)
+    if resume and checkpoint_file:
+        if os.path.exists(checkpoint_file):
+            saved = load_checkpoint(checkpoint_file, key)
+            best_length, best_path = saved["best_length"], saved["best_path"]
+            abandon_length = saved["abandon_length"]
+            second_nodes = saved["second_nodes"]
+            stats.update(saved["stats"])
+            random.setstate(saved["rng_state"])
+            print(f"Resuming from {checkpoint_file}, best length {best_length} after {stats['elapsed']:.0f}s of search")
+        else:
+            print(f"No checkpoint at {checkpoint_file}, starting a new search")
+    if best_path is None and warm_start is not None:
+        # an earlier solution seeds the best tour; constructed tours are still abandoned only against each other
+        best_path = [int(node) for node in warm_start]
+        if len(best_path) != num_nodes + 1 or sorted(best_path[:-1]) != list(range(num_nodes)):
+            raise ValueError(f"The saved tour does not visit these {num_nodes} nodes")
+        best_length = tour_length(best_path, dist_matrix)
+        print(f"Starting from a saved tour of length {best_length}")
+    previous_elapsed = stats["elapsed"]
+    previous_restarts = stats["restarts"]
+    previous_improvements = stats["improvements"]
+    if metrics is None:
+        metrics = SearchMetrics()
     
-    user_flag = False
-
-    def user_interrupt():
-        nonlocal user_flag
-        input()
-        user_flag = True
-
-    if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-        sys.stdin.readline()
+    stop = StopControl(enter=enter, time_budget=time_budget, target_length=target_length)
+    stop.start()
+    time_start = stop.start_time
+    last_checkpoint = time_start
+    if best_path is not None:
+        # resumed or warm started: the saved tour already gives an upper bound for the 1-tree
+        metrics.best_length = best_length
+        metrics.lower_bound = lower_bound(dist_matrix, upper_bound=best_length)
+        if gap_tolerance is not None:
+            stop.target_length = metrics.lower_bound * (1 + gap_tolerance)
+
+    def write_checkpoint():
+        nonlocal last_checkpoint
+        stats["elapsed"] = previous_elapsed + time.time() - time_start
+        stats["restarts"] = previous_restarts + metrics.restarts
+        stats["improvements"] = previous_improvements + len(metrics.improvements)
+        save_checkpoint(checkpoint_file, key, best_length, best_path, abandon_length, random.getstate(), stats, second_nodes)
+        last_checkpoint = time.time()
+
+    def should_stop():
+        # both search loops poll this, so it doubles as the checkpoint timer
+        if checkpoint_interval and best_path is not None and time.time() - last_checkpoint >= checkpoint_interval:
+            write_checkpoint()
+        return stop.stopped
+
+    def report_best(path_length, new_path, bound=None):
+        nonlocal best_length, best_path, abandon_length
+        best_length, best_path = path_length, new_path
+        if bound is not None:
+            abandon_length = bound
+        metrics.improvement(path_length)
+        if metrics.lower_bound is None:
+            metrics.lower_bound = lower_bound(dist_matrix, upper_bound=path_length)
+            if gap_tolerance is not None:
+                stop.target_length = metrics.lower_bound * (1 + gap_tolerance)
+        print(f"New best length is {path_length}")
+
+        time_elapsed = time.time() - time_start
+
+        print(f"Time Elapsed: {time_elapsed}")
+        # no gap to report when the bound is zero, e.g. a field of coincident points
+        gap = metrics.gap()
+        if gap is not None:
+            print(f"Gap to lower bound: {100 * gap:.2f}%")
+        if metrics_file:
+            metrics.write(metrics_file, event="improvement")
+        stop.report(path_length)
+
+    # batched mode sweeps every possible second node once instead of sampling with replacement;
+    # the parallel search shrinks this same list as its workers claim batches, so both modes checkpoint it
+    if batch_size and second_nodes is None:
+        second_nodes = list(range(1, num_nodes))
+        random.shuffle(second_nodes)
+
+    # small inputs are solved to optimality instead of searched
+    exact_solution = solve_exact(dist_matrix)
+    if exact_solution is not None:
+        best_length, best_path = exact_solution
+        metrics.lower_bound = best_length
+        metrics.improvement(best_length)
+        print(f"Optimal length is {best_length}")
+    elif workers and workers > 1:
+        best_length, best_path = parallel_search(dist_matrix, workers, should_stop,
+                                                 batch_size, improve, report_best,
+                                                 best_length, best_path, abandon_length, metrics, second_nodes)
+        if not stop.stopped:
+            print("\n All starting nodes searched!")
+    else:
+        #waiting for keyboard interrupt; at least one tour is built even when the budget is already spent
+        while best_path is None or not should_stop():
+            if batch_size:
+                if not second_nodes:
+                    print("\n All starting nodes searched!")
+                    break
+                batch = second_nodes[:batch_size]
+                del second_nodes[:batch_size]
+                path_length, new_path = nn_temperature_batch(abandon_length, dist_matrix, batch)
+            else:
+                path_length, new_path = nn_temperature(abandon_length, dist_matrix)
+            count = len(batch) if batch_size else 1
+            metrics.restart(count, count if path_length >= abandon_length else count - 1)
+
+            if path_length < abandon_length:
+                abandon_length = path_length
+                if improve:
+                    # large inputs can spend longer in local search than the whole budget
+                    path_length, new_path = improve_tour(new_path, dist_matrix, should_stop=should_stop)
+
+            if path_length < best_length:
+                report_best(path_length, new_path)
+    stop.close()
+    if checkpoint_interval and exact_solution is None and best_path is not None:
+        write_checkpoint()
+    if metrics_file:
+        metrics.write(metrics_file, event="final")
+    return best_length, best_path
+
+def find_best_path(batch_size=None, improve=True, workers=None, time_budget=None, target_length=None,
+                   checkpoint_interval=CHECKPOINT_INTERVAL, resume=False, gap_tolerance=None, metrics_file=None, plot="background",
+                   warm_start=None):
+    print("Please Enter Desired Filename: ")
+    
+    file_name = input().strip()
+    
+    base_name = file_name.rsplit('.', 1)[0]
+    coordinate_list = load_coordinates(file_name)
 
+    print(f"There are {len(coordinate_list)} total nodes")
 
-    threading.Thread(target=user_interrupt, daemon = True).start()
-    
-    time_start = time.time()
-
-    #waiting for keyboard interrupt
-    while not user_flag:
-        path_length, new_path = nn_temperature(best_length, dist_matrix)
-
-        if path_length < best_length:
-            best_length = path_length
-            best_path = new_path
-            print(f"New best length is {best_length}")
-            
-            time_elapsed = time.time() - time_start
-            
-            print(f"Time Elapsed: {time_elapsed}")
-    time_stop = time.time()
+    metrics = SearchMetrics()
+    warm_path = load_solution(warm_start)["paths"][0] if warm_start else None
+    best_length, best_path = search_path(coordinate_list, batch_size, improve, workers, time_budget, target_length,
+                                         f"{base_name}_checkpoint.npz", checkpoint_interval, resume, gap_tolerance,
+                                         metrics_file, metrics, warm_start=warm_path)
     print("\n Search stopped!")
     print(f"The best path is: {math.ceil(best_length)}")
-    plot_path(coordinate_list, best_path, f"{base_name}.jpeg")
+    print(metrics.summary())
     print("\n The path order is: ")
     print(best_path)
 
@@ -153,9 +433,29 @@ def find_best_path():
 
     with open (solution_file, "w") as f:
         f.write(", ".join(map(str, best_path)))
+    save_solution(solution_path(base_name), [best_path], [best_length], solver="knn", nodes=len(coordinate_list),
+                  coordinates=file_name, lower_bound=metrics.lower_bound)
 
+    # the route is already on disk; the image follows on its own time
+    render(plot_path, np.asarray(coordinate_list), best_path, f"{base_name}.jpeg", mode=plot)
     return best_path
 
 
 if __name__ == "__main__":
-    find_best_path()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--time-budget", type=float, default=None)
+    parser.add_argument("--target-length", type=float, default=None)
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL)
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--gap-tolerance", type=float, default=None)
+    parser.add_argument("--metrics", default=None)
+    parser.add_argument("--plot", choices=["background", "inline", "none"], default="background")
+    parser.add_argument("--warm-start", default=None, help="a _solution.sol file to start the search from")
+    args = parser.parse_args()
+    find_best_path(args.batch_size, workers=args.workers, time_budget=args.time_budget, target_length=args.target_length,
+                   checkpoint_interval=args.checkpoint_interval, resume=args.resume,
+                   gap_tolerance=args.gap_tolerance, metrics_file=args.metrics, plot=args.plot,
+                   warm_start=args.warm_start)
@@ -0,0 +1,296 @@
+from collections import deque
+import math
+import random
+import numpy as np
+
+EPSILON = 1e-10
+
+def tour_length(path, matrix):
+    path = np.asarray(path)
+    return float(matrix[path[:-1], path[1:]].sum())
+
+def neighbor_lists(matrix, k=8):
+    num_nodes = len(matrix)
+    k = min(k, num_nodes - 1)
+    if k <= 0:
+        return [[] for _ in range(num_nodes)]
+    if hasattr(matrix, 'neighbors'):
+        return matrix.neighbors(k)
+
+    # k+1 closest per row so the node itself can be dropped even with duplicate points
+    nearest = np.argpartition(matrix, k, axis=1)[:, :k + 1]
+    order = np.take_along_axis(matrix, nearest, axis=1).argsort(axis=1)
+    nearest = np.take_along_axis(nearest, order, axis=1).tolist()
+    return [[j for j in row if j != i][:k] for i, row in enumerate(nearest)]
+
+def _positions(tour):
+    pos = [0] * len(tour)
+    for i, node in enumerate(tour):
+        pos[node] = i
+    return pos
+
+def _reverse(tour, pos, i, j):
+    # reverse tour[i..j] cyclically; reversing the complement gives the same cycle, so take the shorter side
+    n = len(tour)
+    inner = (j - i) % n + 1
+    if 2 * inner > n:
+        i, j = (j + 1) % n, (i - 1) % n
+        inner = n - inner
+    for _ in range(inner // 2):
+        a, b = tour[i], tour[j]
+        tour[i], tour[j] = b, a
+        pos[b], pos[a] = i, j
+        i = (i + 1) % n
+        j = (j - 1) % n
+
+def two_opt(tour, matrix, neighbors, should_stop=None, check_every=256):
+    n = len(tour)
+    dist = matrix.item
+    pos = _positions(tour)
+    improved = False
+
+    # cities whose don't-look bit is off
+    queue = deque(tour)
+    queued = [True] * n
+    popped = 0
+
+    while queue:
+        popped += 1
+        if should_stop and popped % check_every == 0 and should_stop():
+            break
+        a = queue.popleft()
+        queued[a] = False
+
+        for forward in (True, False):
+            pa = pos[a]
+            b = tour[(pa + 1) % n] if forward else tour[pa - 1]
+            d_ab = dist(a, b)
+            moved = None
+
+            for c in neighbors[a]:
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                pc = pos[c]
+                d = tour[(pc + 1) % n] if forward else tour[pc - 1]
+                if c == b or d == a:
+                    continue
+
+                delta = d_ac + dist(b, d) - d_ab - dist(c, d)
+                if delta < -EPSILON:
+                    if forward:
+                        _reverse(tour, pos, (pa + 1) % n, pc)
+                    else:
+                        _reverse(tour, pos, pa, (pc - 1) % n)
+                    moved = (a, b, c, d)
+                    break
+
+            if moved:
+                improved = True
+                for node in moved:
+                    if not queued[node]:
+                        queued[node] = True
+                        queue.append(node)
+                break
+
+    return improved
+
+def _exchange(tour, pos, a, b, c, d):
+    # swap edges a-b and c-d for a-c and b-d, where b and d follow a and c in the same direction
+    if tour[(pos[a] + 1) % len(tour)] == b:
+        _reverse(tour, pos, pos[b], pos[c])
+    else:
+        _reverse(tour, pos, pos[c], pos[b])
+
+def _move_segment(tour, pos, p, s1, s2, q, c, e, end):
+    # move the path p-s1..s2-q between the adjacent nodes c and e with `end` touching c; done as two or three
+    # exchanges so only the reversed spans, and their entries in pos, are rewritten
+    n = len(tour)
+    # u comes first walking from q away from the segment, v right after it
+    u, v = (c, e) if (pos[c] - pos[q]) % n < (pos[e] - pos[q]) % n else (e, c)
+    if v == p:
+        # inserting right before p is the mirror image of inserting right after q
+        p, q, s1, s2 = q, p, s2, s1
+        u, v = v, u
+    touching_u = end if u == c else (s2 if end == s1 else s1)
+    _exchange(tour, pos, p, s1, u, v)
+    if u != q:
+        _exchange(tour, pos, p, u, q, s2)
+    # u now touches s2
+    if touching_u == s1 and s1 != s2:
+        _exchange(tour, pos, u, s2, s1, v)
+
+def or_opt(tour, matrix, neighbors, max_segment=3, should_stop=None, check_every=256):
+    n = len(tour)
+    dist = matrix.item
+    pos = _positions(tour)
+    improved = False
+
+    # the same don't-look queue as two_opt; each city tries the segments that start or end at it
+    queue = deque(tour)
+    queued = [True] * n
+    popped = 0
+
+    while queue:
+        popped += 1
+        if should_stop and popped % check_every == 0 and should_stop():
+            break
+        a = queue.popleft()
+        queued[a] = False
+
+        moved = None
+        for seg_len in range(1, max_segment + 1):
+            if n < seg_len + 3:
+                break
+            for start in {pos[a], (pos[a] - seg_len + 1) % n}:
+                s1 = tour[start]
+                s2 = tour[(start + seg_len - 1) % n]
+                p = tour[start - 1]
+                q = tour[(start + seg_len) % n]
+                removal_gain = dist(p, s1) + dist(s2, q) - dist(p, q)
+                if removal_gain <= EPSILON:
+                    continue
+
+                in_segment = lambda node: (pos[node] - start) % n < seg_len
+                for end, other in ((s1, s2), (s2, s1)):
+                    for c in neighbors[end]:
+                        d_ce = dist(c, end)
+                        if d_ce >= removal_gain:
+                            break
+                        if in_segment(c):
+                            continue
+                        pc = pos[c]
+                        for e in (tour[(pc + 1) % n], tour[pc - 1]):
+                            if in_segment(e):
+                                continue
+                            delta = d_ce + dist(other, e) - dist(c, e) - removal_gain
+                            if delta < -EPSILON:
+                                moved = (p, s1, s2, q, c, e, end)
+                                break
+                        if moved:
+                            break
+                    if moved:
+                        break
+                if moved:
+                    break
+            if moved:
+                break
+
+        if moved:
+            _move_segment(tour, pos, *moved)
+            improved = True
+            for node in moved[:6]:
+                if not queued[node]:
+                    queued[node] = True
+                    queue.append(node)
+
+    return improved
+
+def improve_tour(path, matrix, neighbor_count=8, should_stop=None):
+    # should_stop cuts the local search short; the tour it returns is still a valid, partly improved one
+    path = list(path)
+    tour = path[:-1] if len(path) > 1 and path[0] == path[-1] else path
+    if len(tour) < 4:
+        closed = tour + tour[:1]
+        return tour_length(closed, matrix), closed
+
+    neighbors = neighbor_lists(matrix, neighbor_count)
+    while True:
+        two_opt(tour, matrix, neighbors, should_stop)
+        if not or_opt(tour, matrix, neighbors, should_stop=should_stop) or (should_stop and should_stop()):
+            break
+
+    # keep the original starting node first, as the solvers expect
+    start = tour.index(path[0])
+    closed = tour[start:] + tour[:start] + [path[0]]
+    return tour_length(closed, matrix), closed
+
+def _relocate(tour, pos, i, j):
+    # move tour[i] so it sits at position j, shifting everything in between by one
+    node = tour[i]
+    if i < j:
+        tour[i:j] = tour[i + 1:j + 1]
+        for k in range(i, j):
+            pos[tour[k]] = k
+    else:
+        tour[j + 1:i + 1] = tour[j:i]
+        for k in range(j + 1, i + 1):
+            pos[tour[k]] = k
+    tour[j] = node
+    pos[node] = j
+
+def anneal(path, matrix, should_stop, on_improvement=None, neighbor_count=8, cooling=0.95, check_every=256):
+    path = list(path)
+    tour = path[:-1] if len(path) > 1 and path[0] == path[-1] else path
+    n = len(tour)
+    if n < 5:
+        return improve_tour(path, matrix)
+
+    dist = matrix.item
+    neighbors = neighbor_lists(matrix, neighbor_count)
+    pos = _positions(tour)
+    length = tour_length(tour + tour[:1], matrix)
+    if length <= 0:
+        # every point coincides: nothing to improve, and no temperature to start from
+        return length, tour + tour[:1]
+    best_length = length
+    best_tour = tour[:]
+
+    # start around a tenth of an average edge and cool geometrically, reheating from the best tour when frozen
+    start_temperature = 0.1 * length / n
+    temperature = start_temperature
+    steps_per_temperature = 10 * n
+    step = 0
+
+    while True:
+        improved = False
+        for _ in range(steps_per_temperature):
+            step += 1
+            if step % check_every == 0 and should_stop():
+                if improved and on_improvement:
+                    on_improvement(best_length, best_tour + best_tour[:1])
+                start = best_tour.index(path[0])
+                closed = best_tour[start:] + best_tour[:start] + [path[0]]
+                return tour_length(closed, matrix), closed
+
+            a = random.randrange(n)
+            c = random.choice(neighbors[a])
+            pa, pc = pos[a], pos[c]
+
+            if random.random() < 0.5:
+                # 2-opt: reconnect a-c and the two nodes that followed them
+                b = tour[(pa + 1) % n]
+                d = tour[(pc + 1) % n]
+                if c == b or d == a:
+                    continue
+                delta = dist(a, c) + dist(b, d) - dist(a, b) - dist(c, d)
+                if delta < 0 or random.random() < math.exp(-delta / temperature):
+                    _reverse(tour, pos, (pa + 1) % n, pc)
+                    length += delta
+            else:
+                # or-opt: move a between c and the node after c
+                e = tour[(pc + 1) % n]
+                p = tour[pa - 1]
+                q = tour[(pa + 1) % n]
+                if e == a:
+                    continue
+                delta = (dist(p, q) - dist(p, a) - dist(a, q)
+                         + dist(c, a) + dist(a, e) - dist(c, e))
+                if delta < 0 or random.random() < math.exp(-delta / temperature):
+                    _relocate(tour, pos, pa, pc if pa < pc else pc + 1)
+                    length += delta
+
+            if length < best_length - EPSILON:
+                best_length = length
+                best_tour = tour[:]
+                improved = True
+
+        if improved and on_improvement:
+            on_improvement(best_length, best_tour + best_tour[:1])
+
+        temperature *= cooling
+        if temperature < 1e-3 * start_temperature:
+            temperature = 0.5 * start_temperature
+            tour[:] = best_tour
+            pos = _positions(tour)
+            length = best_length
@@ -0,0 +1,94 @@
+import json
+import time
+import numpy as np
+from exact import one_tree_bound, _mst
+
+# the subgradient 1-tree costs an O(n^2) MST per iteration, so past this size a single MST is the bound
+ONE_TREE_LIMIT = 1000
+BOUND_ITERATIONS = 100
+
+def euclidean_mst_length(coordinates):
+    # the Euclidean MST lies inside the Delaunay triangulation, so only its O(n) edges need to be considered
+    from scipy.spatial import Delaunay
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import minimum_spanning_tree
+    coords = np.asarray(coordinates, dtype=np.float64)
+    num_nodes = len(coords)
+    if num_nodes < 3:
+        return float(np.hypot(*(coords[-1] - coords[0]))) if num_nodes == 2 else 0.0
+    try:
+        simplices = Delaunay(coords).simplices
+    except Exception:
+        # collinear points cannot be triangulated; their MST is the segment they span
+        centered = coords - coords.mean(axis=0)
+        direction = np.linalg.svd(centered, full_matrices=False)[2][0]
+        return float(np.ptp(centered @ direction))
+    edges = np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+    # neighbouring triangles share edges, and the sparse matrix would add the duplicates together
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    lengths = np.hypot(*(coords[edges[:, 0]] - coords[edges[:, 1]]).T)
+    # duplicate points give zero-length edges, which the sparse graph would drop as missing
+    graph = coo_matrix((np.maximum(lengths, 1e-12), (edges[:, 0], edges[:, 1])), shape=(num_nodes, num_nodes))
+    return float(minimum_spanning_tree(graph).sum())
+
+def lower_bound(matrix, upper_bound=None, iterations=BOUND_ITERATIONS):
+    num_nodes = len(matrix)
+    if num_nodes < 3:
+        return 0.0
+    if hasattr(matrix, 'coords'):
+        return euclidean_mst_length(matrix.coords)
+    if num_nodes <= ONE_TREE_LIMIT:
+        return one_tree_bound(matrix, iterations, upper_bound=upper_bound)[0]
+    return float(_mst(np.asarray(matrix, dtype=np.float64)))
+
+class SearchMetrics:
+    # counters a search loop bumps as it goes; snapshot() is the structured report
+    def __init__(self, lower_bound=None):
+        self.start_time = time.time()
+        self.lower_bound = lower_bound
+        self.restarts = 0
+        # restarts that were abandoned early or finished no better than the abandon bound
+        self.pruned = 0
+        self.best_length = float('inf')
+        self.improvements = []
+
+    def restart(self, count=1, pruned=0):
+        self.restarts += count
+        self.pruned += pruned
+
+    def improvement(self, length):
+        self.best_length = length
+        self.improvements.append((time.time() - self.start_time, length))
+
+    def gap(self, length=None):
+        length = self.best_length if length is None else length
+        if not self.lower_bound or length == float('inf'):
+            return None
+        return (length - self.lower_bound) / self.lower_bound
+
+    def snapshot(self):
+        elapsed = time.time() - self.start_time
+        gap = self.gap()
+        return {
+            "elapsed": elapsed,
+            "best_length": self.best_length if self.best_length != float('inf') else None,
+            "lower_bound": self.lower_bound,
+            "gap": gap,
+            "restarts": self.restarts,
+            "restarts_per_second": self.restarts / elapsed if elapsed > 0 else 0.0,
+            "pruned": self.pruned,
+            "pruned_ratio": self.pruned / self.restarts if self.restarts else 0.0,
+            "improvements": [{"time": t, "length": length} for t, length in self.improvements],
+        }
+
+    def summary(self):
+        snapshot = self.snapshot()
+        text = f"{snapshot['restarts']} restarts ({snapshot['restarts_per_second']:.1f}/s, {100 * snapshot['pruned_ratio']:.1f}% pruned)"
+        if snapshot["gap"] is not None:
+            text = f"Lower bound {snapshot['lower_bound']:.2f}, gap {100 * snapshot['gap']:.2f}%, " + text
+        return text
+
+    def write(self, file_path, **extra):
+        # one JSON object per line, so a long search can be tailed while it runs
+        with open(file_path, "a") as f:
+            f.write(json.dumps({**extra, **self.snapshot()}) + "\n")
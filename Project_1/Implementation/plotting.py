@@ -0,0 +1,136 @@
+import multiprocessing as mp
+import re
+import sys
+import numpy as np
+
+# matplotlib is only imported once something is drawn, so solver runs that never plot skip its start-up cost
+
+def _pyplot():
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        # figures are only ever saved to disk; a notebook that already chose a backend keeps it
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+def _route_lines(points, **style):
+    # one collection for every leg of a route instead of one plot call per edge
+    from matplotlib.collections import LineCollection
+    points = np.asarray(points, dtype=np.float64)
+    return LineCollection(np.stack([points[:-1], points[1:]], axis=1), **style)
+
+def plot_path(coords, path, filename):
+    plt = _pyplot()
+    coords = np.asarray(coords, dtype=np.float64)
+    path = np.asarray(path)
+    fig, ax = plt.subplots(figsize=(7,7))
+    ax.scatter(coords[:, 0], coords[:, 1], c='blue')
+    ax.add_collection(_route_lines(coords[path], colors='r', linewidths=1))
+    ax.scatter(coords[path[0], 0], coords[path[0], 1], c='green', s=100, label='Start')
+    ax.scatter(coords[path[-1], 0], coords[path[-1], 1], c='red', s=100, label='End')
+    ax.set_title("Best Path So Far")
+    fig.tight_layout()
+    fig.savefig(filename, dpi=300, format='jpeg')
+    plt.close(fig)
+
+def plot_labelled_path(coords, best_path, fileName):
+    plt = _pyplot()
+    coords = np.asarray(coords, dtype=np.float64)
+    points = coords[np.asarray(best_path)]
+    fig, ax = plt.subplots()
+    ax.add_collection(_route_lines(points, colors='blue'))
+    ax.plot(points[:, 0], points[:, 1], 'o', color='blue', markersize=6)
+    ax.scatter(points[0, 0], points[0, 1], color='orange', s=100, zorder=5)
+
+    for i, (x_i, y_i) in enumerate(coords):
+        ax.text(x_i + 0.1, y_i + 0.1, str(i), fontsize=10)
+
+    ax.set_title(fileName + " Path")
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.grid(True)
+    ax.axis("equal")
+    ax.axis("tight")
+
+    fig.savefig(fileName + "_path.jpg", format='jpg', dpi=300)
+    plt.close(fig)
+
+def plot_clusters_and_paths(coords, labels, center, cluster_best_paths, output = "clusters", depots = False):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8,8))
+    num_clusters = len(center)
+    cmap = plt.get_cmap("tab10",num_clusters)
+    coords = np.asarray(coords, dtype=np.float64)
+    labels = np.asarray(labels)
+
+    for i in range(num_clusters):
+        clusters_points = coords[labels == i]
+        color = cmap(i%10)
+        if clusters_points.size > 0:
+            ax.scatter(clusters_points[:,0], clusters_points[:,1], color = color, s = 20, label = f"Cluster {i+1}")
+        c = np.asarray(center[i], dtype=np.float64)
+        ax.scatter(c[0],c[1], marker = 'X', s = 100, color = color, edgecolor = 'blue')
+        path = cluster_best_paths[i] if i < len(cluster_best_paths) else None
+        if path is None or len(path) == 0:
+            continue
+        route = clusters_points[np.asarray(path)]
+        if depots:
+            # depot routes fly out of the pad and back
+            route = np.vstack([c, route, c])
+        ax.add_collection(_route_lines(route, colors = [color], linewidths = 1))
+        ax.plot(route[:,0], route[:,1], 'o', color = color, markersize=4)
+    ax.set_title(output)
+    ax.set_xlabel("X Coordinate")
+    ax.set_ylabel("Y Coordinate")
+    ax.legend(loc = "best")
+    fig.savefig(output + ".jpeg", dpi = 100)
+    plt.close(fig)
+
+def plot_cluster_solution(coords, solution, output):
+    if solution["pads"] is None:
+        plot_clusters_and_paths(coords, solution["labels"], solution["centroids"], solution["paths"], output=output)
+    else:
+        plot_clusters_and_paths(coords, solution["labels"], solution["pads"], solution["paths"], output=output, depots=True)
+
+def render_in_background(function, *args):
+    # a spawned process imports matplotlib and draws while the caller carries on; it is joined at interpreter exit
+    process = mp.get_context("spawn").Process(target=function, args=args)
+    process.start()
+    return process
+
+def render(function, *args, mode="background"):
+    # "background" draws in a spawned process, "inline" draws here and now, "none" skips the image
+    if mode == "background":
+        return render_in_background(function, *args)
+    if mode == "inline":
+        function(*args)
+    elif mode != "none":
+        raise ValueError(f"Unknown plot mode {mode}")
+    return None
+
+def read_route(solution_file):
+    # knn writes "0, 5, 3, ..., 0" and randomSearch "0 5 3 ... 0"; either way the route is the integers in order
+    with open(solution_file) as f:
+        return [int(node) for node in re.findall(r"-?\d+", f.read())]
+
+if __name__ == "__main__":
+    import argparse
+    from coordinates import load_coordinates
+    parser = argparse.ArgumentParser(description="Render a saved route without re-running the solver")
+    parser.add_argument("coordinates")
+    parser.add_argument("solution", help="a .sol file, or a knn/randomSearch route in text")
+    parser.add_argument("--output", default=None, help="image name without the .jpeg extension")
+    args = parser.parse_args()
+    base_name = args.output or args.solution.rsplit('.', 1)[0]
+    coords = load_coordinates(args.coordinates)
+    if args.solution.endswith(".sol"):
+        from solutions import load_solution
+        solution = load_solution(args.solution)
+        if solution["labels"] is None:
+            plot_path(coords, solution["paths"][0], base_name + ".jpeg")
+        else:
+            # plot_clusters_and_paths adds the extension itself
+            plot_cluster_solution(coords, solution, base_name)
+    else:
+        plot_path(coords, read_route(args.solution), base_name + ".jpeg")
+    print("Plot written to " + base_name + ".jpeg")
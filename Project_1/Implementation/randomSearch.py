@@ -1,61 +1,43 @@
-import csv
-from typing import List, Tuple
 import numpy as np
 import random
-import msvcrt
 import math
-import matplotlib.pyplot as plt
 import time
-
-def plotAndSavePath(coords, best_path, fileName):
-    x = [float(coords[i][0]) for i in best_path]
-    y = [float(coords[i][1]) for i in best_path]
-
-    plt.plot(x, y, '-o', color='blue', markersize=6)
-    plt.scatter(x[0], y[0], color='orange', s=100, zorder=5)
-    
-    for i, (x_i, y_i) in enumerate(coords):
-        plt.text(x_i + 0.1, y_i + 0.1, str(i), fontsize=10)
-    
-    plt.title(fileName + " Path")
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.grid(True)
-    plt.axis("equal")
-    plt.axis("tight")
-
-    plt.savefig(fileName + "_path.jpg", format='jpg', dpi=300)
-    return
-
-def read_coords_as_tuple(file_path:str) -> List[Tuple[float,float]]: 
-    coordinates = []
-    with open(file_path, 'r', newline='') as csvfile:
-        csv_reader = csv.reader(csvfile)
-        for row_num, row in enumerate(csv_reader, 1):
-            if len(row) != 2:
-                raise ValueError(f"Row {row_num} must contain 2 values")
-            x, y = map(float, row)
-            coordinates.append((x, y))
-    return coordinates
-
-def distance_matrix(coordinates):
-    coordinates = np.array(coordinates)
-    x = coordinates[:, 0]
-    y = coordinates[:, 1]
-    dx = x[:, np.newaxis] - x[np.newaxis, :]
-    dy = y[:, np.newaxis] - y[np.newaxis, :]
-    return np.sqrt(dx**2 + dy**2)
+import sys
+from local_search import improve_tour, tour_length, anneal
+from distances import distance_provider
+from stop_control import StopControl
+from coordinates import load_coordinates
+from metrics import SearchMetrics, lower_bound
+from plotting import plot_labelled_path, render
+from solutions import save_solution
 
 def random_path(coordinates):
     n = len(coordinates)
     middle = list(range(1, n))
     random.shuffle(middle)
     path = [0] + middle + [0]
-    dist = sum(coordinates[path[i]][path[i+1]] for i in range(n))
+    dist = tour_length(path, coordinates)
     return dist, path
 
-def find_best_rand_path(file_path):
-    coords = read_coords_as_tuple(file_path)
+def random_paths(coordinates, batch_size, rng=None):
+    n = len(coordinates)
+    if rng is None:
+        rng = np.random.default_rng()
+    paths = np.zeros((batch_size, n + 1), dtype=np.intp)
+    paths[:, 1:n] = rng.permuted(np.broadcast_to(np.arange(1, n), (batch_size, n - 1)), axis=1)
+    # one gather of every edge in every path, then a row sum
+    dists = coordinates[paths[:, :-1], paths[:, 1:]].sum(axis=1)
+    return dists, paths
+
+def stream_random_paths(coordinates, batch_size=1024, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    while True:
+        yield random_paths(coordinates, batch_size, rng)
+
+def find_best_rand_path(file_path, improve=True, method="random", batch_size=1024, time_budget=None, target_length=None,
+                        metrics_file=None, metrics=None, seed=None, enter=True):
+    coords = load_coordinates(file_path)
 
     if len(coords) <= 0:
         return 0, True
@@ -64,27 +46,60 @@ def find_best_rand_path(file_path):
     else:
         print("There are " + str(len(coords)) + " nodes, computing route..")
         print("  Shortest Route Discovered So Far")
-    dist_matrix = distance_matrix(coords)
+    dist_matrix = distance_provider(coords)
     best_distance = float('inf')
     best_path = None
+    if metrics is None:
+        metrics = SearchMetrics()
+    metrics.lower_bound = lower_bound(dist_matrix)
+    rng = np.random.default_rng(seed)
 
-    startTime = time.time()
+    stop = StopControl(enter=enter, time_budget=time_budget, target_length=target_length)
+    stop.start()
+    startTime = stop.start_time
 
-    for i in range(0, math.factorial(len(coords) - 1)):
-        if msvcrt.kbhit() and msvcrt.getch() == b"\r":
-            break
-        distance,path = random_path(dist_matrix)
-        if distance < best_distance:
-            best_distance = distance
-            best_path = path
+    if method == "anneal":
+        # anneal from one random tour; best-so-far is reported once per temperature step
+        def report(distance, path):
             currTime = time.time() - startTime
-            print("    " + str(best_distance) + " Time: " + str(currTime))
+            print("    " + str(distance) + " Time: " + str(currTime))
+            metrics.improvement(distance)
+            stop.report(distance)
+
+        best_distance, best_path = random_path(dist_matrix)
+        report(best_distance, best_path)
+        best_distance, best_path = anneal(best_path, dist_matrix, stop, on_improvement=report)
+    else:
+        remaining = math.factorial(len(coords) - 1)
+        for distances, paths in stream_random_paths(dist_matrix, min(batch_size, remaining), rng):
+            remaining -= len(paths)
+            metrics.restart(len(paths))
+            best = distances.argmin()
+            if distances[best] < best_distance:
+                best_distance = float(distances[best])
+                best_path = paths[best].tolist()
+                currTime = time.time() - startTime
+                print("    " + str(best_distance) + " Time: " + str(currTime))
+                metrics.improvement(best_distance)
+                stop.report(best_distance)
+            if stop.stopped or remaining <= 0:
+                break
+    stop.close()
+    if improve and best_path is not None:
+        best_distance, best_path = improve_tour(best_path, dist_matrix)
+        print("  Improved Route " + str(best_distance))
+        metrics.improvement(best_distance)
+    print("  " + metrics.summary())
+    if metrics_file:
+        metrics.write(metrics_file, method=method)
     return best_distance, best_path, coords
 
 if __name__ == "__main__":
     file_name=input("Enter the name of file: ")
     tempFileName = "../Dataset/" + file_name
-    best_dist, best_path, coords = find_best_rand_path(tempFileName)
+    method = sys.argv[1] if len(sys.argv) > 1 else "random"
+    plot = sys.argv[2] if len(sys.argv) > 2 else "background"
+    best_dist, best_path, coords = find_best_rand_path(tempFileName, method=method)
 
     if best_path == True:
         print("There are less that 1 node, resulting in no solution")
@@ -101,5 +116,7 @@ if __name__ == "__main__":
                     f.write(str(best_path[i]) + " ")
                 else:
                     f.write(str(best_path[i]))
-        
-        plotAndSavePath(coords, best_path, newFileName)
\ No newline at end of file
+        save_solution(newFileName + ".sol", [best_path], [best_dist], solver=method, nodes=len(coords), coordinates=file_name)
+
+        # labelling every node is the slow part of this figure, so it renders off the main process
+        render(plot_labelled_path, np.asarray(coords), best_path, newFileName, mode=plot)
\ No newline at end of file
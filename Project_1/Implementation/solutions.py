@@ -0,0 +1,85 @@
+import json
+import os
+import time
+import numpy as np
+
+# one file per solution: a JSON header line, then the raw arrays it describes, each 64-byte aligned so
+# load_solution can memory-map them in place instead of parsing text
+MAGIC = "drone-solution"
+VERSION = 1
+ALIGN = 64
+
+def solution_path(base_name):
+    return f"{base_name}_solution.sol"
+
+def _aligned(size):
+    return -(-size // ALIGN) * ALIGN
+
+def save_solution(file_path, paths, lengths, labels=None, centroids=None, pads=None, **metadata):
+    # a cluster's path indexes into its own members, as in the _SOLUTION_ text files; a single tour is one path
+    paths = [np.asarray(path if path is not None else [], dtype=np.int32) for path in paths]
+    arrays = {
+        "routes": np.concatenate(paths) if paths else np.empty(0, dtype=np.int32),
+        "offsets": np.cumsum([0] + [len(path) for path in paths], dtype=np.int64),
+        "lengths": np.asarray(lengths, dtype=np.float64),
+    }
+    if labels is not None:
+        arrays["labels"] = np.asarray(labels, dtype=np.int32)
+    if centroids is not None:
+        arrays["centroids"] = np.asarray(centroids, dtype=np.float64)
+    if pads is not None:
+        arrays["pads"] = np.asarray(pads, dtype=np.float64)
+
+    metadata.setdefault("saved_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"format": MAGIC, "version": VERSION, "arrays": layout, "metadata": metadata},
+                        default=lambda value: value.item()).encode()
+    header = header.ljust(_aligned(len(header) + 1) - 1) + b"\n"
+
+    # write under a temporary name first so a rerun replaces the previous solution instead of appending to it
+    temp_file = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_file, "wb") as f:
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(len(header) + layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(temp_file, file_path)
+
+def load_solution(file_path, mmap=True):
+    with open(file_path, "rb") as f:
+        header = json.loads(f.readline())
+        data_start = f.tell()
+    if header.get("format") != MAGIC:
+        raise ValueError(f"{file_path} is not a solution file")
+    if header["version"] > VERSION:
+        raise ValueError(f"{file_path} was written by a newer version ({header['version']})")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if mmap and np.prod(shape) > 0:
+            arrays[name] = np.memmap(file_path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape)
+        else:
+            with open(file_path, "rb") as f:
+                f.seek(data_start + spec["offset"])
+                count = int(np.prod(shape))
+                arrays[name] = np.fromfile(f, dtype=spec["dtype"], count=count).reshape(shape)
+
+    offsets = arrays["offsets"]
+    metadata = header["metadata"]
+    # the same keys as a clustering solution, so plot_cluster_solution and friends take it as is
+    return {
+        "paths": [arrays["routes"][offsets[j]:offsets[j + 1]] for j in range(len(offsets) - 1)],
+        "lengths": arrays["lengths"],
+        "labels": arrays.get("labels"),
+        "centroids": arrays.get("centroids"),
+        "pads": arrays.get("pads"),
+        "k": metadata.get("k", len(offsets) - 1),
+        "total": float(arrays["lengths"].sum()),
+        "metadata": metadata,
+    }
@@ -0,0 +1,83 @@
+import math
+import numpy as np
+
+class GridIndex:
+    # uniform grid over the points; removed points are dropped from their cell so queries only see live points
+    def __init__(self, coordinates, points_per_cell=2):
+        coords = np.asarray(coordinates, dtype=np.float64)
+        num_nodes = len(coords)
+        self._x = coords[:, 0].tolist()
+        self._y = coords[:, 1].tolist()
+        self.alive = np.ones(num_nodes, dtype=bool)
+        self.remaining = num_nodes
+
+        low = coords.min(axis=0) if num_nodes else np.zeros(2)
+        high = coords.max(axis=0) if num_nodes else np.zeros(2)
+        span = np.maximum(high - low, 1e-12)
+        cells_wanted = max(1, num_nodes // points_per_cell)
+        self.cell_size = float(max(math.sqrt(span[0] * span[1] / cells_wanted), span.max() / cells_wanted, 1e-12))
+        self.x0, self.y0 = float(low[0]), float(low[1])
+        self.nx = int(span[0] // self.cell_size) + 1
+        self.ny = int(span[1] // self.cell_size) + 1
+
+        cx = ((coords[:, 0] - self.x0) // self.cell_size).astype(int)
+        cy = ((coords[:, 1] - self.y0) // self.cell_size).astype(int)
+        self.node_cell = (np.minimum(cx, self.nx - 1) * self.ny + np.minimum(cy, self.ny - 1)).tolist()
+        self.cells = [[] for _ in range(self.nx * self.ny)]
+        for node, cell in enumerate(self.node_cell):
+            self.cells[cell].append(node)
+
+    def __len__(self):
+        return self.remaining
+
+    def remove(self, node):
+        if self.alive[node]:
+            self.alive[node] = False
+            self.cells[self.node_cell[node]].remove(node)
+            self.remaining -= 1
+
+    def _brute_force(self, x, y):
+        live = np.flatnonzero(self.alive)
+        xs = np.take(self._x, live)
+        ys = np.take(self._y, live)
+        dists = np.hypot(xs - x, ys - y)
+        j = dists.argmin()
+        return int(live[j]), float(dists[j])
+
+    def nearest_to(self, x, y):
+        if self.remaining == 0:
+            return None, float('inf')
+
+        cx = min(max(int((x - self.x0) // self.cell_size), 0), self.nx - 1)
+        cy = min(max(int((y - self.y0) // self.cell_size), 0), self.ny - 1)
+        best_node = None
+        best_dist = float('inf')
+        cells_seen = 0
+        radius = 0
+        max_radius = max(self.nx, self.ny)
+
+        while radius <= max_radius:
+            for i in range(max(cx - radius, 0), min(cx + radius, self.nx - 1) + 1):
+                on_edge = i == cx - radius or i == cx + radius
+                step = 1 if on_edge else 2 * radius
+                for j in range(max(cy - radius, 0) if on_edge else cy - radius, min(cy + radius, self.ny - 1) + 1, max(step, 1)):
+                    if j < 0:
+                        continue
+                    cells_seen += 1
+                    for node in self.cells[i * self.ny + j]:
+                        d = math.hypot(self._x[node] - x, self._y[node] - y)
+                        if d < best_dist:
+                            best_node, best_dist = node, d
+
+            # anything outside the scanned rings is at least radius cells away
+            if best_dist <= radius * self.cell_size:
+                break
+            # sparse grids late in a tour: a scan over the live points is cheaper than more empty rings
+            if cells_seen > self.remaining:
+                return self._brute_force(x, y)
+            radius += 1
+
+        return best_node, best_dist
+
+    def nearest(self, node):
+        return self.nearest_to(self._x[node], self._y[node])
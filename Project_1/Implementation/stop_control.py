@@ -0,0 +1,96 @@
+import select
+import signal
+import sys
+import threading
+import time
+
+class StopControl:
+    # search loops only read the `stopped` flag; Enter, Ctrl+C, the time budget and the target length set it
+    def __init__(self, enter=True, sigint=True, time_budget=None, target_length=None):
+        self.enter = enter
+        self.sigint = sigint
+        self.time_budget = time_budget
+        self.target_length = target_length
+        self.stopped = False
+        self.reason = None
+        self.start_time = None
+        self._timer = None
+        self._watcher = None
+        self._previous_handler = None
+
+    def __call__(self):
+        return self.stopped
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self.start_time = time.time()
+
+        if self.enter:
+            # drop anything already typed (e.g. the newline after the file name)
+            try:
+                if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
+                    sys.stdin.readline()
+            except (OSError, ValueError):
+                pass
+            self._watcher = threading.Thread(target=self._wait_for_enter, daemon=True)
+            self._watcher.start()
+
+        if self.sigint and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGINT, self._on_sigint)
+
+        if self.time_budget is not None:
+            self._timer = threading.Timer(self.time_budget, self.stop, args=("time budget",))
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def close(self):
+        self.stop(self.reason or "closed")
+        if self._watcher is not None:
+            self._watcher.join(timeout=1)
+            self._watcher = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGINT, self._previous_handler)
+            self._previous_handler = None
+
+    def stop(self, reason="stopped"):
+        if not self.stopped:
+            self.reason = reason
+            self.stopped = True
+
+    def report(self, length):
+        if self.target_length is not None and length <= self.target_length:
+            self.stop("target length")
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def _wait_for_enter(self):
+        try:
+            # poll rather than block in input(), so the thread never holds stdin when the search ends on its own
+            while not self.stopped:
+                if select.select([sys.stdin], [], [], 0.2)[0]:
+                    if sys.stdin.readline():
+                        self.stop("enter")
+                    return
+        except (OSError, ValueError):
+            # consoles select() cannot watch (Windows) fall back to a blocking read
+            try:
+                input()
+            except (EOFError, OSError, ValueError):
+                return
+            self.stop("enter")
+
+    def _on_sigint(self, signum, frame):
+        # a second Ctrl+C falls through to the normal KeyboardInterrupt
+        signal.signal(signal.SIGINT, self._previous_handler or signal.default_int_handler)
+        self._previous_handler = None
+        self.stop("interrupt")
@@ -1,241 +1,466 @@
-from sklearn.cluster import KMeans
-from typing import List, Tuple
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from datetime import datetime, timedelta
 import numpy as np
-import csv
 import sys
 import threading
-import random
 import select
+import queue
 import time
-import matplotlib.pyplot as plt
-
-def plot_clusters_and_paths(coords, labels, center, cluster_best_paths, output = "clusters"):
-    plt.figure(figsize=(8,8))
-    num_clusters = len(center)
-    cmap = plt.get_cmap("tab10",num_clusters)
-    coords = np.array(coords)
-
-    for i in range(num_clusters):
-        mask = (labels ==i)
-        clusters_points = coords[mask]
-        color = cmap (i%10)
-        if clusters_points.size > 0:
-            plt.scatter(clusters_points[:,0], clusters_points[:,1], color = color, s = 20, label = f"Cluster {i+1}")
-        c = center[i]
-        plt.scatter(c[0],c[1], marker = 'X', s = 100, color = color, edgecolor = 'blue')
-        if i < len(cluster_best_paths):
-            path = cluster_best_paths[i]
-            cluster_coordinates = clusters_points.tolist()
-            try:
-                path_coords = [cluster_coordinates[idx] for idx in path]
-                xs = [p[0] for p in path_coords]
-                ys = [p[1] for p in path_coords]
-                plt.plot(xs,ys, '-', color = color, linewidth=1)
-                plt.plot(xs,ys, 'o', color = color, markersize=4)
-            except Exception:
-                pass
-    plt.title(output)
-    plt.xlabel("X Coordinate")
-    plt.ylabel("Y Coordinate")
-    plt.legend(loc = "best")
-    plt.savefig(output + ".jpeg", dpi = 100)
-    plt.close()
-
-def read_coords_as_tuple(file_path:str) -> List[Tuple[float,float]]:
-    coordinates = []
-    with open(file_path, 'r', newline='') as csvfile:
-        csv_reader = csv.reader(csvfile)
-        for row_num, row in enumerate(csv_reader, 1):
-            if len(row) != 2:
-                raise ValueError(f"Row {row_num} must contain 2 values")
-            x, y = map(float, row)
-            coordinates.append((x, y))
-    return coordinates
-
-def createCluster(coords, file_name):
-    coords_np = np.array(coords)
-    oneClusterBSF = []
-    oneClusterLSF = []
-    twoClusterBSF = []
-    twoClusterLSF = []
-    threeClusterBSF = []
-    threeClusterLSF = []
-    fourClusterBSF = []
-    fourClusterLSF = []
-    oneCentroid = []
-    twoCentroids = []
-    threeCentroids = []
-    fourCentroids = []
-    oneLabels = []
-    twoLabels = []
-    threeLabels = []
-    fourLabels = []
-    
-    for i in range(1,5):
-        kmeans = KMeans(n_clusters=i, n_init="auto")
-        kmeans.fit(coords_np)
-        labels = kmeans.labels_
-        centroids = kmeans.cluster_centers_
-        clusters = []
-        individualDists = []
-
-        for j in range(i):
-            clusters_coords = coords_np[labels == j].tolist()
-            clusters.append(clusters_coords)
-            
-        totalDistance = 0
-        cluster_best_paths = []
-        for cluster in clusters:
-            if len(cluster) > 0:
-                best_path, clusterDist = find_best_path(cluster)
-                totalDistance += clusterDist
-                cluster_best_paths.append(best_path)
-                individualDists.append(clusterDist)
-               
-                if i==1:
-                    oneClusterBSF.append(best_path)
-                    oneClusterLSF.append(clusterDist)
-                    oneCentroid = centroids
-                    oneLabels = labels
-                elif i==2:
-                    twoClusterBSF.append(best_path)
-                    twoClusterLSF.append(clusterDist)
-                    twoCentroids = centroids
-                    twoLabels = labels
-                elif i==3:
-                    threeClusterBSF.append(best_path)
-                    threeClusterLSF.append(clusterDist)
-                    threeCentroids = centroids
-                    threeLabels = labels
-                elif i==4:
-                    fourClusterBSF.append(best_path)
-                    fourClusterLSF.append(clusterDist)
-                    fourCentroids = centroids
-                    fourLabels = labels
-            else:
-                cluster_best_paths.append(None)
-    
-        print(f"{i}) If you use {i} drone(s), the total route will be {totalDistance:.2f} meters")
-        for j, c in enumerate(centroids):
-            print(f"    Landing Pad {j+1} should be at ({c[0]:.2f}, {c[1]:.2f}), serving {len(clusters[j])}, route is {individualDists[j]:.2f} meters")
-    
-    solution1 = ""
-    solution2 = ""
-    solution3 = ""
-    solution4 = ""
-    fileNumber = int(input("Please select your choice 1 to 4: "))
-    output = f"{file_name}_{fileNumber}_OVERALL_SOLUTION" 
-    if fileNumber == 1:
-        solution1 = fileName + "_1_SOLUTION_" + str(round(oneClusterLSF[0])) + ".txt"
-        print("Writing " + solution1 + " to disk")
-        plot_clusters_and_paths(coords_np, oneLabels, oneCentroid, oneClusterBSF, output=output)
-        with open(solution1, "a") as f:
-            f.write(str(oneClusterBSF[0]))
-    elif fileNumber == 2:
-        solution1 = fileName + "_1_SOLUTION_" + str(round(twoClusterLSF[0])) + ".txt"
-        solution2 = fileName + "_2_SOLUTION_" + str(round(twoClusterLSF[1])) + ".txt"
-        print("Writing " + solution1 + ", " + solution2 + " to disk")
-        plot_clusters_and_paths(coords_np, twoLabels, twoCentroids, twoClusterBSF, output=output)
-        with open(solution1, "a") as f:
-            f.write(str(twoClusterBSF[0]))
-        with open(solution2, "a") as f:
-            f.write(str(twoClusterBSF[1]))
-    elif fileNumber == 3:
-        solution1 = fileName + "_1_SOLUTION_" + str(round(threeClusterLSF[0])) + ".txt"
-        solution2 = fileName + "_2_SOLUTION_" + str(round(threeClusterLSF[1])) + ".txt"
-        solution3 = fileName + "_3_SOLUTION_" + str(round(threeClusterLSF[2])) + ".txt"
-        print("Writing " + solution1 + ", " + solution2 + ", " + solution3 + " to disk")
-        plot_clusters_and_paths(coords_np, threeLabels, threeCentroids, threeClusterBSF, output=output)
-        with open(solution1, "a") as f:
-            f.write(str(threeClusterBSF[0]))
-        with open(solution2, "a") as f:
-            f.write(str(threeClusterBSF[1]))
-        with open(solution3, "a") as f:
-            f.write(str(threeClusterBSF[2]))
-    elif fileNumber == 4:
-        solution1 = fileName + "_1_SOLUTION_" + str(round(fourClusterLSF[0])) + ".txt"
-        solution2 = fileName + "_2_SOLUTION_" + str(round(fourClusterLSF[1])) + ".txt"
-        solution3 = fileName + "_3_SOLUTION_" + str(round(fourClusterLSF[2])) + ".txt"
-        solution4 = fileName + "_4_SOLUTION_" + str(round(fourClusterLSF[3])) + ".txt"
-        print("Writing " + solution1 + ", " + solution2 + ", " + solution3 + ", " + solution4 + " to disk")
-        plot_clusters_and_paths(coords_np, fourLabels, fourCentroids, fourClusterBSF, output=output)
-        with open(solution1, "a") as f:
-            f.write(str(fourClusterBSF[0]))
-        with open(solution2, "a") as f:
-            f.write(str(fourClusterBSF[1]))
-        with open(solution3, "a") as f:
-            f.write(str(fourClusterBSF[2]))
-        with open(solution4, "a") as f:
-            f.write(str(fourClusterBSF[3]))
-
-
-def distance_matrix(coordinates):
-    coordinates = np.array(coordinates)
-    x = coordinates[:,0]
-    y = coordinates[:,1]
-    dx = x[:, np.newaxis] - x[np.newaxis, :]
-    dy = y[:,np.newaxis] - y[np.newaxis,:]
-    dist_matrix = np.sqrt(dx**2 + dy**2)
-    return dist_matrix
-
-def nn_temperature(best_path, matrix):
-    starting_node = 0
-    path = [starting_node]
-    visited = {starting_node}
-    path_length = 0
-
-    next_node = random.choice([i for i in range(1,len(matrix))])
-    path.append(next_node)
-    visited.add(next_node)
-    path_length = matrix[starting_node][next_node]
-
-    for i in range(len(matrix) - 2):
-        curr_node = path[-1]
-        next_node = None
-        best_distance = float('inf')
-        
-        for j in range(len(matrix)):
-            if j in visited:
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+# the TSP engine lives with the Project 1 solvers
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'Project_1' / 'Implementation'))
+from knn import nn_temperature
+from local_search import improve_tour
+from distances import distance_provider
+from exact import solve_exact
+from stop_control import StopControl
+from coordinates import load_coordinates
+from metrics import SearchMetrics, lower_bound
+from plotting import plot_cluster_solution, render
+from solutions import save_solution
+
+# a cluster sharing this much of its membership with one from the previous k is repaired, not re-solved
+REUSE_OVERLAP = 0.9
+# bounds are only worth their O(n^2) cost per iteration on moderate clusters
+BOUND_LIMIT = 500
+BOUND_ITERATIONS = 50
+# past this many points k-means runs on mini-batches of CHUNK_ROWS points instead of the full array
+STREAMING_LIMIT = 100000
+CHUNK_ROWS = 65536
+STREAMING_PASSES = 2
+# seconds every cluster gets even after earlier clusters overran the budget
+MIN_CLUSTER_BUDGET = 0.1
+# Beardwood-Halton-Hammersley constant: a random uniform tour of n points over area A is about 0.7124 * sqrt(n * A)
+BHH_CONSTANT = 0.7124
+
+def _split_worst_cluster(coords_np, labels, centroids):
+    # warm start for k+1: split the cluster with the largest spread along its principal axis
+    spread = [((coords_np[labels == j] - c) ** 2).sum() for j, c in enumerate(centroids)]
+    worst = int(np.argmax(spread))
+    members = coords_np[labels == worst]
+    axis = np.zeros(coords_np.shape[1])
+    if len(members) > 1:
+        values, vectors = np.linalg.eigh(np.cov(members.T))
+        axis = vectors[:, -1] * np.sqrt(max(values[-1], 0))
+    centroid = centroids[worst]
+    return np.vstack([np.delete(centroids, worst, axis=0), centroid - axis, centroid + axis])
+
+def minibatch_kmeans(coords_np, k, init="k-means++", chunk_rows=CHUNK_ROWS, passes=STREAMING_PASSES, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    kmeans = MiniBatchKMeans(n_clusters=k, init=init, n_init=1, batch_size=chunk_rows)
+    for _ in range(passes):
+        # shuffled chunks, since field files are usually recorded along the rows and would drag the centroids
+        order = rng.permutation(len(coords_np))
+        for start in range(0, len(order), chunk_rows):
+            chunk = coords_np[np.sort(order[start:start + chunk_rows])]
+            if len(chunk) >= k:
+                kmeans.partial_fit(chunk)
+    labels = np.empty(len(coords_np), dtype=np.int32)
+    for start in range(0, len(coords_np), chunk_rows):
+        labels[start:start + chunk_rows] = kmeans.predict(coords_np[start:start + chunk_rows])
+    return labels, kmeans.cluster_centers_
+
+def estimate_tour_length(points, cell_size):
+    # cheap stand-in for a solved tour: the BHH estimate over the area of occupied grid cells, so gaps in a block
+    # do not count, but never below twice the longest side of the bounding box
+    if len(points) < 2:
+        return 0.0
+    cells = np.unique(np.floor(points / cell_size).astype(np.int64), axis=0)
+    span = points.max(axis=0) - points.min(axis=0)
+    return max(BHH_CONSTANT * np.sqrt(len(points) * len(cells) * cell_size ** 2), 2 * span.max())
+
+def balance_clusters(coords_np, labels, centroids, iterations=200, step_fraction=0.05):
+    # shave boundary points off the longest cluster onto a neighbour until the longest estimated route stops shrinking
+    labels = np.array(labels, dtype=np.int32)
+    k = len(centroids)
+    if k < 2:
+        return labels, centroids
+    centroids = np.array([coords_np[labels == j].mean(axis=0) if (labels == j).any() else c
+                          for j, c in enumerate(centroids)])
+    # cells hold about four points on average
+    span = coords_np.max(axis=0) - coords_np.min(axis=0)
+    cell_size = max(np.sqrt(4 * span[0] * span[1] / len(coords_np)), 1e-9)
+    estimates = np.array([estimate_tour_length(coords_np[labels == j], cell_size) for j in range(k)])
+    step = step_fraction
+
+    for _ in range(iterations):
+        longest = int(estimates.argmax())
+        members = np.flatnonzero(labels == longest)
+        moves = int(len(members) * step)
+        if moves < 1:
+            break
+        points = coords_np[members]
+        dists = np.hypot(points[:, 0, np.newaxis] - centroids[:, 0], points[:, 1, np.newaxis] - centroids[:, 1])
+        margins = dists - dists[:, longest, np.newaxis]
+        margins[:, longest] = np.inf
+        # the shortest route among the clusters bordering this one takes the points closest to it
+        bordering = np.unique(margins.argmin(axis=1))
+        target = int(bordering[estimates[bordering].argmin()])
+        moved = members[np.argsort(margins[:, target])[:moves]]
+
+        trial = labels.copy()
+        trial[moved] = target
+        trial_estimates = estimates.copy()
+        for j in (longest, target):
+            trial_estimates[j] = estimate_tour_length(coords_np[trial == j], cell_size)
+        if trial_estimates.max() < estimates.max():
+            labels, estimates = trial, trial_estimates
+            for j in (longest, target):
+                centroids[j] = coords_np[labels == j].mean(axis=0)
+        else:
+            step /= 2
+    return labels, centroids
+
+def kmeans_sweep(coords_np, k_values, chunk_rows=None):
+    k_values = set(k_values)
+    if chunk_rows is None and len(coords_np) > STREAMING_LIMIT:
+        chunk_rows = CHUNK_ROWS
+    labels = None
+    centroids = None
+    for k in range(1, max(k_values) + 1):
+        init = "k-means++" if centroids is None else _split_worst_cluster(coords_np, labels, centroids)
+        if chunk_rows:
+            labels, centroids = minibatch_kmeans(coords_np, k, init, chunk_rows)
+        else:
+            kmeans = KMeans(n_clusters=k, init=init, n_init=1)
+            kmeans.fit(coords_np)
+            labels = kmeans.labels_
+            centroids = kmeans.cluster_centers_
+        if k in k_values:
+            yield k, labels, centroids
+
+def _closest_previous_cluster(previous_members, members):
+    best_j = None
+    best_overlap = 0
+    for j, old in enumerate(previous_members):
+        if len(old) == 0:
+            continue
+        shared = len(np.intersect1d(old, members, assume_unique=True))
+        overlap = shared / (len(old) + len(members) - shared)
+        if overlap > best_overlap:
+            best_j, best_overlap = j, overlap
+    return best_j if best_overlap >= REUSE_OVERLAP else None
+
+def repair_cluster_tour(old_members, old_path, old_length, members, cluster, depot=False):
+    # with depot=True node 0 of `cluster` and of the paths is the landing pad, and the points start at 1
+    offset = 1 if depot else 0
+    if np.array_equal(old_members, members) and not depot:
+        return old_path.tolist(), old_length
+
+    # cluster memberships change with every k-means fit, so their matrices are not worth caching
+    dist_matrix = distance_provider(cluster, cache=False)
+    exact_solution = solve_exact(dist_matrix)
+    if exact_solution is not None:
+        best_length, best_path = exact_solution
+        return best_path, best_length
+
+    # keep the old visiting order for points that stayed, then cheapest-insert the newcomers
+    position = {int(node): p + offset for p, node in enumerate(members)}
+    visited = old_path[offset:-1] - offset
+    tour = [position[node] for node in old_members[visited].tolist() if node in position]
+    kept = set(tour)
+    # a depot pad moves with k, so it is inserted like a newcomer
+    for p in range(len(cluster)):
+        if p in kept:
+            continue
+        stops = np.array(tour)
+        following = np.roll(stops, -1)
+        cost = dist_matrix[stops, p] + dist_matrix[p, following] - dist_matrix[stops, following]
+        tour.insert(int(cost.argmin()) + 1, p)
+
+    start = tour.index(0)
+    best_length, best_path = improve_tour(tour[start:] + tour[:start] + [0], dist_matrix)
+    return best_path, best_length
+
+def place_pad(cluster, path, target):
+    # a pad on the route itself adds no flight distance, so put it where the closed tour passes nearest `target`
+    cluster = np.asarray(cluster, dtype=np.float64)
+    loop = [int(node) for node in path[:-1]]
+    stops = cluster[loop]
+    segments = cluster[loop[1:] + loop[:1]] - stops
+    squared = np.maximum((segments ** 2).sum(axis=1), 1e-18)
+    t = np.clip(((target - stops) * segments).sum(axis=1) / squared, 0, 1)
+    points = stops + t[:, np.newaxis] * segments
+    e = int(np.hypot(*(points - target).T).argmin())
+    # fly pad -> the far end of edge e -> around the loop -> the near end -> pad
+    return points[e], loop[e + 1:] + loop[:e + 1]
+
+def _route_coords(cluster, centroid, pads):
+    return np.vstack([centroid, cluster]) if pads == "centroid" else cluster
+
+def _solve_cluster(job, time_budget, should_stop=None):
+    i, j, cluster = job
+    metrics = SearchMetrics()
+    best_path, clusterDist = find_best_path(cluster, time_budget=time_budget, metrics=metrics, should_stop=should_stop)
+    return i, j, best_path, clusterDist, metrics.snapshot()
+
+def solve_clusters(jobs, total_budget=250, workers=None, should_stop=None):
+    # jobs are ((k, balanced), cluster index, cluster coords); smaller k first so whole answers come out early,
+    # and largest first within a k so its longest solve does not start last
+    jobs = sorted(jobs, key=lambda job: (job[0][0], -len(job[2])))
+    total_points = sum(len(job[2]) for job in jobs)
+
+    if not workers or workers <= 1:
+        remaining_budget = total_budget
+        remaining_points = total_points
+        for job in jobs:
+            if should_stop and should_stop():
+                return
+            # split what is left of the budget by size, so time saved on easy clusters rolls over
+            cluster_budget = max(remaining_budget * len(job[2]) / remaining_points, MIN_CLUSTER_BUDGET)
+            cluster_start = time.time()
+            i, j, best_path, clusterDist, snapshot = _solve_cluster(job, cluster_budget, should_stop)
+            if should_stop and should_stop():
+                # cut short for a caller that no longer wants it
+                return
+            yield (i, j), (best_path, clusterDist), snapshot
+            remaining_budget = max(remaining_budget - (time.time() - cluster_start), 0)
+            remaining_points -= len(job[2])
+        return
+
+    # with `workers` solves running at once each job can take a proportionally larger slice
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+    try:
+        futures = [executor.submit(_solve_cluster, job, min(total_budget, total_budget * workers * len(job[2]) / total_points))
+                   for job in jobs]
+        pending = set(futures)
+        while pending:
+            # wake up now and then so should_stop is heard between finished clusters
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, j, best_path, clusterDist, snapshot = future.result()
+                yield (i, j), (best_path, clusterDist), snapshot
+            if should_stop and should_stop():
+                return
+    finally:
+        # the caller may stop listening once it has the k it wants
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def solve_sweep(coords_np, k_values=range(1, 5), total_budget=250, workers=None, balanced=False, pads="centroid", should_stop=None):
+    # pads: "centroid" routes every cluster out of its centroid and back, "optimized" puts the pad on the solved
+    # tour where it passes nearest the centroid, None keeps closed tours through the points only;
+    # should_stop ends the sweep early, e.g. once the operator has picked a k that is already solved
+    # fits are keyed by (k, balanced); balancing only has BHH estimates to go on, so a balanced labelling is
+    # solved beside the plain one and each k keeps whichever gives the shorter longest route
+    fits = {}
+    variants = {}
+    for i, labels, centroids in kmeans_sweep(coords_np, k_values):
+        labellings = [(False, labels, centroids)]
+        if balanced:
+            balanced_labels, balanced_centroids = balance_clusters(coords_np, labels, centroids)
+            if not np.array_equal(balanced_labels, labels):
+                labellings.append((True, balanced_labels, balanced_centroids))
+        variants[i] = []
+        for flag, labels, centroids in labellings:
+            members = [np.flatnonzero(labels == j) for j in range(i)]
+            clusters = [coords_np[m] for m in members]
+            fits[(i, flag)] = (labels, centroids, clusters, members)
+            variants[i].append((i, flag))
+
+    # clusters that barely change from k-1 to k are repaired from the earlier tour once it exists; the rest are solved
+    jobs = []
+    dependents = {}
+    pending = {f: 0 for f in fits}
+    for f, (labels, centroids, clusters, members) in fits.items():
+        i, flag = f
+        previous = (i - 1, flag) if (i - 1, flag) in fits else (i - 1, False)
+        for j, cluster in enumerate(clusters):
+            if len(cluster) == 0:
                 continue
-            curr_distance = matrix[curr_node][j]
-            if curr_distance < best_distance:
-                next_node = j
-                best_distance = curr_distance
-    
-        if next_node is None:
-            return float('inf'), None
-        
-        path_length += best_distance
-        path.append(next_node)
-        visited.add(next_node)
-        
-        if path_length >= best_path:
-            return float('inf'), None
-
-    path_length += matrix[path[-1]][0]
-    path.append(0)
-    return path_length, path
-
-def find_best_path(clusterCoords):
-    dist_matrix = distance_matrix(clusterCoords)
+            pending[f] += 1
+            source = _closest_previous_cluster(fits[previous][3], members[j]) if previous in fits else None
+            if source is None:
+                jobs.append((f, j, _route_coords(cluster, centroids[j], pads)))
+            else:
+                dependents.setdefault((previous, source), []).append((f, j))
+
+    results = {}
+    # search metrics of solved clusters; repaired ones have none
+    snapshots = {}
+    ready = []
+    def finish(key, result):
+        f, j = key
+        results[key] = result
+        pending[f] -= 1
+        if pending[f] == 0:
+            ready.append(f)
+        old_path, old_length = result
+        for f2, j2 in dependents.pop(key, []):
+            route_coords = _route_coords(fits[f2][2][j2], fits[f2][1][j2], pads)
+            finish((f2, j2), repair_cluster_tour(fits[f][3][j], np.array(old_path), old_length,
+                                                 fits[f2][3][j2], route_coords, depot=pads == "centroid"))
+
+    def build(f):
+        labels, centroids, clusters, members = fits[f]
+        paths = [results[(f, j)][0] if len(cluster) > 0 else None for j, cluster in enumerate(clusters)]
+        lengths = [results[(f, j)][1] if len(cluster) > 0 else 0.0 for j, cluster in enumerate(clusters)]
+        pad_coords = None
+        if pads == "centroid":
+            # depot paths become the visiting order of the cluster's own points
+            pad_coords = np.array(centroids, dtype=np.float64)
+            paths = [[int(p) - 1 for p in path[1:-1]] if path is not None else None for path in paths]
+        elif pads == "optimized":
+            pad_coords = np.array(centroids, dtype=np.float64)
+            for j, path in enumerate(paths):
+                if path is not None:
+                    pad_coords[j], paths[j] = place_pad(clusters[j], path, centroids[j])
+        return {"k": f[0], "balanced": f[1], "labels": labels, "centroids": centroids, "pads": pad_coords, "clusters": clusters,
+                "paths": paths, "lengths": lengths, "total": sum(lengths), "longest": max(lengths),
+                "metrics": [snapshots.get((f, j)) for j in range(len(clusters))]}
+
+    built = {}
+    for key, result, snapshot in solve_clusters(jobs, total_budget, workers, should_stop):
+        snapshots[key] = snapshot
+        finish(key, result)
+        while ready:
+            f = ready.pop(0)
+            i = f[0]
+            built.setdefault(i, []).append(build(f))
+            if len(built[i]) == len(variants[i]):
+                yield min(built.pop(i), key=lambda solution: solution["longest"])
+
+def _read_choice(picks, k_values):
+    # runs beside the solves; hands back the first valid drone count, or None if stdin closes
+    while True:
+        try:
+            line = input()
+        except (EOFError, OSError, ValueError):
+            picks.put(None)
+            return
+        try:
+            choice = int(line)
+        except ValueError:
+            choice = None
+        if choice in k_values:
+            picks.put(choice)
+            return
+        print(f"Please select one of {', '.join(map(str, k_values))}")
+
+def print_solution(solution):
+    i = solution["k"]
+    print(f"{i}) If you use {i} drone(s), the total route will be {solution['total']:.2f} meters, the longest {solution['longest']:.2f} meters")
+    pads = solution["centroids"] if solution["pads"] is None else solution["pads"]
+    for j, c in enumerate(pads):
+        snapshot = solution["metrics"][j]
+        gap = f" ({100 * snapshot['gap']:.1f}% above its lower bound)" if snapshot and snapshot["gap"] is not None else ""
+        print(f"    Landing Pad {j+1} should be at ({c[0]:.2f}, {c[1]:.2f}), serving {len(solution['clusters'][j])}, route is {solution['lengths'][j]:.2f} meters{gap}")
+
+def write_solution(coords_np, solution, file_name, plot="background"):
+    k = solution["k"]
+    output = f"{file_name}_{k}_OVERALL_SOLUTION"
+    routes = [(path, length) for path, length in zip(solution["paths"], solution["lengths"]) if path is not None]
+    names = [file_name + "_" + str(j + 1) + "_SOLUTION_" + str(round(length)) + ".txt" for j, (path, length) in enumerate(routes)]
+    print("Writing " + ", ".join(names) + " to disk")
+    for name, (path, length) in zip(names, routes):
+        with open(name, "w") as f:
+            f.write(str(list(map(int, path))))
+    save_solution(output + ".sol", solution["paths"], solution["lengths"], solution["labels"], solution["centroids"], solution["pads"],
+                  solver="clustering", k=k, nodes=len(coords_np), longest=solution["longest"])
+    # the routes are what the drones need; the overview image renders after them, off the main process by default
+    render(plot_cluster_solution, coords_np, solution, output, mode=plot)
+    return output
+
+def createCluster(coords, file_name, total_budget=250, workers=None, k_values=range(1,5), on_solution=None, balanced=False, pads="centroid",
+                  plot="background"):
+    coords_np = np.asarray(coords, dtype=np.float64)
+    k_values = sorted(set(k_values))
+    solutions = {}
+
+    picks = queue.Queue()
+    threading.Thread(target=_read_choice, args=(picks, k_values), daemon=True).start()
+    print(f"Routes are listed as they finish; enter a drone count ({k_values[0]} to {k_values[-1]}) at any time to choose it")
+
+    choice = None
+    answered = False
+    def chosen():
+        # polled by the solves as well, so a pick of an already listed k does not wait for the next one
+        nonlocal choice, answered
+        if not answered and not picks.empty():
+            choice, answered = picks.get(), True
+            if choice is not None and choice not in solutions:
+                print(f"Waiting for the {choice} drone route to finish")
+        return choice in solutions
+
+    for solution in solve_sweep(coords_np, k_values, total_budget, workers, balanced, pads, should_stop=chosen):
+        solutions[solution["k"]] = solution
+        print_solution(solution)
+        if on_solution:
+            on_solution(solution)
+        if chosen():
+            break
+    if not answered:
+        print(f"Please select your choice {k_values[0]} to {k_values[-1]}: ", end="", flush=True)
+        choice = picks.get()
+
+    if choice is not None:
+        write_solution(coords_np, solutions[choice], file_name, plot)
+    return solutions
+
+
+def find_best_path(clusterCoords, time_budget=25, patience=100, gap_tolerance=0.02, metrics=None, should_stop=None):
+    if metrics is None:
+        metrics = SearchMetrics()
+    dist_matrix = distance_provider(clusterCoords, cache=False)
+    exact_solution = solve_exact(dist_matrix)
+    if exact_solution is not None:
+        best_length, best_path = exact_solution
+        metrics.lower_bound = best_length
+        metrics.improvement(best_length)
+        return best_path, best_length
+
     best_length = float('inf')
     best_path = None
-    
-    startTime = time.time()
-    while (time.time() - startTime) < 25:
-        path_length, new_path = nn_temperature(best_length, dist_matrix)
-        if path_length < best_length:
-            best_length = path_length
-            best_path = new_path
+    abandon_length = float('inf')
+    since_improvement = 0
+
+    # stop on the time budget, after `patience` restarts without improvement, or once within gap_tolerance of the lower bound
+    with StopControl(enter=False, sigint=False, time_budget=time_budget) as stop:
+        def stopped():
+            if should_stop is not None and not stop.stopped and should_stop():
+                stop.stop("caller")
+            return stop.stopped
+
+        # at least one tour is built even when the budget is already spent
+        while best_path is None or (not stopped() and since_improvement < patience):
+            path_length, new_path = nn_temperature(abandon_length, dist_matrix)
+            metrics.restart(pruned=path_length >= abandon_length)
+            if path_length < abandon_length:
+                abandon_length = path_length
+                path_length, new_path = improve_tour(new_path, dist_matrix, should_stop=stopped)
+            if path_length < best_length:
+                best_length = path_length
+                best_path = new_path
+                since_improvement = 0
+                metrics.improvement(best_length)
+                if metrics.lower_bound is None and len(clusterCoords) <= BOUND_LIMIT:
+                    metrics.lower_bound = lower_bound(dist_matrix, upper_bound=best_length, iterations=BOUND_ITERATIONS)
+                    stop.target_length = metrics.lower_bound * (1 + gap_tolerance)
+                stop.report(best_length)
+            else:
+                since_improvement += 1
 
     return best_path, best_length
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("max_drones", type=int, nargs="?", default=4)
+    parser.add_argument("--balanced", action="store_true")
+    parser.add_argument("--pads", choices=["centroid", "optimized", "none"], default="centroid")
+    parser.add_argument("--plot", choices=["background", "inline", "none"], default="background")
+    args = parser.parse_args()
+
     fileName = input("Enter the name of the file: ")
     tempFileName = "../Dataset/" + fileName + ".csv"
-    coords = read_coords_as_tuple(tempFileName)
-    estimatedSolutionTime = datetime.now() + timedelta(minutes=5)
-    print("There are " + str(len(coords)) + " nodes: Solutions will be available by " + estimatedSolutionTime.strftime("%I:%M %p"))
+    coords = load_coordinates(tempFileName)
+    totalBudget = 250
+    estimatedSolutionTime = datetime.now() + timedelta(seconds=totalBudget)
+    print("There are " + str(len(coords)) + " nodes: Solutions will be available by " + estimatedSolutionTime.strftime("%I:%M %p") + " at the latest")
     
-    createCluster(coords, fileName)
\ No newline at end of file
+    createCluster(coords, fileName, totalBudget, workers=os.cpu_count(), k_values=range(1, args.max_drones + 1), balanced=args.balanced,
+                  pads=None if args.pads == "none" else args.pads, plot=args.plot)
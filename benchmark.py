@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / 'Project_1' / 'Implementation'))
+sys.path.insert(0, str(ROOT / 'Project_2' / 'Implementation'))
+from coordinates import load_coordinates
+from metrics import SearchMetrics
+
+DATASETS = (sorted(ROOT.glob('Project_1/Dataset/*.csv')) + sorted(ROOT.glob('Project_1/Dataset_test/*.csv'))
+            + sorted(ROOT.glob('Project_2/Dataset/*.csv')))
+SOLVERS = ["knn", "knn-batch", "random", "anneal", "clustering"]
+# randomSearch refuses larger inputs
+RANDOM_LIMIT = 256
+RESULTS_DIR = ROOT / 'benchmark_results'
+# a case that overruns its budget by this much is reported as a timeout
+GRACE = 60
+
+def _peak_rss_mb(children=False):
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _run_knn(coords, dataset, budget, workers, seed, batch_size=None):
+    from knn import search_path
+    metrics = SearchMetrics()
+    best_length = search_path(coords, batch_size=batch_size, workers=workers, time_budget=budget,
+                              metrics=metrics, enter=False)[0]
+    return best_length, metrics.snapshot()
+
+def _run_random(coords, dataset, budget, workers, seed, method):
+    from randomSearch import find_best_rand_path
+    metrics = SearchMetrics()
+    best_length = find_best_rand_path(str(dataset), method=method, time_budget=budget, metrics=metrics,
+                                      seed=seed, enter=False)[0]
+    return best_length, metrics.snapshot()
+
+def _run_clustering(coords, dataset, budget, workers, seed):
+    from clustering import solve_sweep
+    start = time.time()
+    solutions = []
+    for solution in solve_sweep(coords, range(1, 5), total_budget=budget, workers=workers):
+        restarts = sum(m["restarts"] for m in solution["metrics"] if m)
+        solutions.append({"k": solution["k"], "time": time.time() - start, "total": solution["total"],
+                          "longest": solution["longest"], "restarts": restarts})
+    elapsed = time.time() - start
+    restarts = sum(s["restarts"] for s in solutions)
+    snapshot = {"restarts": restarts, "restarts_per_second": restarts / elapsed if elapsed else 0.0,
+                "improvements": [{"time": s["time"], "length": s["total"], "k": s["k"]} for s in solutions],
+                "solutions": solutions}
+    return min(s["total"] for s in solutions), snapshot
+
+def run_case(solver, dataset, budget, workers, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    coords = load_coordinates(dataset)
+    start = time.time()
+    # the solvers print their progress; a benchmark only wants the record
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if solver in ("knn", "knn-batch"):
+            best_length, snapshot = _run_knn(coords, dataset, budget, workers, seed, 64 if solver == "knn-batch" else None)
+        elif solver in ("random", "anneal"):
+            best_length, snapshot = _run_random(coords, dataset, budget, workers, seed, solver)
+        elif solver == "clustering":
+            best_length, snapshot = _run_clustering(coords, dataset, budget, workers, seed)
+        else:
+            raise ValueError(f"Unknown solver {solver}")
+    return {
+        "solver": solver,
+        "dataset": Path(dataset).name,
+        "nodes": len(coords),
+        "seed": seed,
+        "budget": budget,
+        "workers": workers,
+        "wall_clock": time.time() - start,
+        "best_length": float(best_length),
+        "lower_bound": snapshot.get("lower_bound"),
+        "gap": snapshot.get("gap"),
+        "restarts": snapshot.get("restarts"),
+        "restarts_per_second": snapshot.get("restarts_per_second"),
+        "pruned_ratio": snapshot.get("pruned_ratio"),
+        "best_over_time": snapshot.get("improvements"),
+        "solutions": snapshot.get("solutions"),
+    }
+
+def _case_process(case, results, cache_dir):
+    # every case starts from an empty distance cache, so one run's matrices never speed up the next
+    os.environ["DRONE_CACHE_DIR"] = cache_dir
+    import distances
+    distances.CACHE_DIR = Path(cache_dir)
+    try:
+        record = run_case(*case)
+    except Exception as error:
+        record = {"solver": case[0], "dataset": Path(case[1]).name, "seed": case[4], "error": repr(error)}
+    # each case runs in its own process, so these peaks belong to this case alone
+    record["peak_rss_mb"] = _peak_rss_mb()
+    record["peak_worker_rss_mb"] = _peak_rss_mb(children=True)
+    results.put(record)
+
+def _version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def cases(solvers, datasets, seeds, budget, workers):
+    for dataset in datasets:
+        nodes = len(load_coordinates(dataset))
+        for solver in solvers:
+            if solver in ("random", "anneal") and not 1 < nodes <= RANDOM_LIMIT:
+                continue
+            for seed in seeds:
+                yield solver, str(dataset), budget, workers, seed
+
+def run_benchmarks(solvers, datasets, seeds, budget, workers, output):
+    ctx = mp.get_context("spawn")
+    run = {"version": _version(), "run_at": datetime.now().isoformat(timespec="seconds"),
+           "python": platform.python_version(), "numpy": np.__version__, "cpus": os.cpu_count(),
+           "distance_cache": "fresh per case"}
+    output.parent.mkdir(parents=True, exist_ok=True)
+    records = []
+    for case in cases(solvers, datasets, seeds, budget, workers):
+        results = ctx.Queue()
+        cache_dir = tempfile.mkdtemp(prefix="drone_bench_")
+        proc = ctx.Process(target=_case_process, args=(case, results, cache_dir))
+        proc.start()
+        try:
+            record = results.get(timeout=budget + GRACE)
+        except queue.Empty:
+            proc.kill()
+            record = {"solver": case[0], "dataset": Path(case[1]).name, "seed": case[4], "error": "timeout"}
+        proc.join()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        record.update(run)
+        records.append(record)
+        with open(output, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        if "error" in record:
+            print(f"{record['solver']:>10} {record['dataset']:<20} failed: {record['error']}")
+        else:
+            rate = record["restarts_per_second"] or 0.0
+            peak = record["peak_rss_mb"]
+            print(f"{record['solver']:>10} {record['dataset']:<20} best {record['best_length']:10.2f}  "
+                  f"{rate:10.1f} restarts/s  {record['wall_clock']:6.1f}s" + (f"  {peak:7.1f} MB" if peak else ""))
+    return records
+
+def _load(file_path):
+    with open(file_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {(r["solver"], r["dataset"], r["seed"], r.get("budget"), r.get("workers")): r
+            for r in records if "error" not in r}
+
+def compare(old_file, new_file, tolerance=0.05):
+    # longer tours, lower throughput or more memory than `tolerance` allows count as regressions
+    old, new = _load(old_file), _load(new_file)
+    regressions = 0
+    for key in sorted(old.keys() & new.keys(), key=str):
+        before, after = old[key], new[key]
+        notes = []
+        if after["best_length"] > before["best_length"] * (1 + tolerance):
+            notes.append(f"length {before['best_length']:.2f} -> {after['best_length']:.2f}")
+        if before.get("restarts_per_second") and (after.get("restarts_per_second") or 0) < before["restarts_per_second"] * (1 - tolerance):
+            notes.append(f"restarts/s {before['restarts_per_second']:.1f} -> {after['restarts_per_second'] or 0:.1f}")
+        if before.get("peak_rss_mb") and after.get("peak_rss_mb") and after["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            notes.append(f"peak memory {before['peak_rss_mb']:.1f} -> {after['peak_rss_mb']:.1f} MB")
+        regressions += bool(notes)
+        print(f"{key[0]:>10} {key[1]:<20} seed {key[2]}: " + ("; ".join(notes) if notes else "ok"))
+    print(f"{regressions} regression(s) in {len(old.keys() & new.keys())} shared case(s)")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--solvers", nargs="+", choices=SOLVERS, default=SOLVERS)
+    parser.add_argument("--datasets", nargs="+", default=None, help="dataset files; defaults to every bundled .csv")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--budget", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, tolerance=args.tolerance) else 0)
+    datasets = [Path(d) for d in args.datasets] if args.datasets else DATASETS
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}_{_version() or 'local'}.jsonl"
+    run_benchmarks(args.solvers, datasets, args.seeds, args.budget, args.workers, output)
+    print(f"Results written to {output}")
@@ -0,0 +1,114 @@
+import argparse
+import contextlib
+import glob
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / 'Project_1' / 'Implementation'))
+sys.path.insert(0, str(ROOT / 'Project_2' / 'Implementation'))
+
+# the formats load_coordinates understands, .csv first since the Project_1 datasets ship in both
+PATTERNS = ("*.csv", "*.txt")
+
+def _is_output(path):
+    # solution files written by earlier runs are .txt too
+    return path.stem.endswith("_solution") or "_SOLUTION_" in path.stem
+
+def find_inputs(sources):
+    files = []
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            found = [f for pattern in PATTERNS for f in sorted(path.glob(pattern)) if not _is_output(f)]
+            stems = set()
+            files += [f for f in found if not (f.stem in stems or stems.add(f.stem))]
+        elif path.exists():
+            files.append(path)
+        else:
+            files += [Path(f) for f in sorted(glob.glob(source)) if not _is_output(Path(f))]
+    # keep the first of any repeats, e.g. a file named both directly and through its directory
+    seen = set()
+    return [f for f in files if not (f.resolve() in seen or seen.add(f.resolve()))]
+
+def route_file(file_path, solver, budget, output_dir, drones, pads, balanced):
+    from coordinates import load_coordinates
+    from solutions import save_solution, solution_path
+    file_path = Path(file_path)
+    base_name = str(Path(output_dir or file_path.parent) / file_path.stem)
+    coords = load_coordinates(file_path)
+    start = time.time()
+
+    # solver progress would interleave across files; the batch prints one line per file instead
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if solver == "knn":
+            from knn import search_path
+            best_length, best_path = search_path(coords, workers=1, time_budget=budget, enter=False)
+            with open(f"{base_name}_solution.txt", "w") as f:
+                f.write(", ".join(map(str, best_path)))
+            save_solution(solution_path(base_name), [best_path], [best_length], solver="knn", nodes=len(coords),
+                          coordinates=str(file_path))
+            plot = ("path", (coords, best_path, f"{base_name}.jpeg"))
+        else:
+            from clustering import solve_sweep, write_solution
+            solution = next(solve_sweep(coords, [drones], total_budget=budget, workers=1, balanced=balanced, pads=pads))
+            output = write_solution(coords, solution, base_name, plot="none")
+            best_length = solution["total"]
+            plot = ("clusters", (coords, solution, output))
+    return str(file_path), len(coords), best_length, time.time() - start, plot
+
+def render_plot(kind, args):
+    from plotting import plot_path, plot_cluster_solution
+    if kind == "path":
+        plot_path(*args)
+    else:
+        plot_cluster_solution(*args)
+
+def run_batch(files, solver="knn", budget=30, workers=None, output_dir=None, drones=4, pads="centroid",
+              balanced=False, plot=True):
+    ctx = mp.get_context("spawn")
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    results = []
+    # plots render in their own process, so a slow figure never holds up the next solve
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx) as solvers, \
+            ProcessPoolExecutor(max_workers=1, mp_context=ctx) as plotter:
+        futures = {solvers.submit(route_file, f, solver, budget, output_dir, drones, pads, balanced): f for f in files}
+        plots = []
+        for future in as_completed(futures):
+            try:
+                file_path, nodes, best_length, elapsed, (kind, args) = future.result()
+            except Exception as error:
+                print(f"{futures[future]}: failed: {error!r}")
+                continue
+            print(f"{file_path}: {nodes} nodes, route {best_length:.2f} meters in {elapsed:.1f}s")
+            results.append((file_path, best_length))
+            if plot:
+                plots.append(plotter.submit(render_plot, kind, args))
+        for future in plots:
+            future.result()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="coordinate files, directories or glob patterns")
+    parser.add_argument("--solver", choices=["knn", "clustering"], default="knn")
+    parser.add_argument("--budget", type=float, default=30, help="seconds of search per file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="files solved at once")
+    parser.add_argument("--output-dir", default=None, help="defaults to each input's own directory")
+    parser.add_argument("--drones", type=int, default=4)
+    parser.add_argument("--pads", choices=["centroid", "optimized", "none"], default="centroid")
+    parser.add_argument("--balanced", action="store_true")
+    parser.add_argument("--no-plot", action="store_true")
+    args = parser.parse_args()
+
+    files = find_inputs(args.inputs)
+    if not files:
+        sys.exit("No coordinate files matched")
+    print(f"Routing {len(files)} file(s) with {args.workers} worker(s), {args.budget:g}s each")
+    run_batch(files, args.solver, args.budget, args.workers, args.output_dir, args.drones,
+              None if args.pads == "none" else args.pads, args.balanced, not args.no_plot)